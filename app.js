@@ -817,7 +817,14 @@ document.addEventListener("keydown", (e) => {
 // Refresh button — triggers a background re-fetch then polls
 document.getElementById("refreshBtn").addEventListener("click", async () => {
   try {
-    await fetch("/api/refresh", { method: "POST" });
+    const res = await fetch("/api/refresh", { method: "POST" });
+    const { status } = await res.json();
+    if (status === "fresh") {
+      // Live data was fetched a few minutes ago — nothing to re-fetch
+      const el = document.getElementById("dataTimestamp");
+      if (!el.textContent.endsWith(" · already up to date")) el.textContent += " · already up to date";
+      return;
+    }
     // Give it a moment to start, then poll
     setTimeout(fetchData, 2000);
   } catch (e) {
@@ -3,15 +3,37 @@
 using direct Yahoo Finance v8 chart API with proper headers.
 Saves to SQLite database. Run this once to populate the DB."""
 
+import asyncio
+import email.utils
 import json
 import sqlite3
 import time
+import zlib
+from contextlib import contextmanager
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+from datetime import date, datetime, timedelta
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson  # optional: C-accelerated JSON for the larger chart payloads
+except ImportError:
+    orjson = None
 
 DB_FILE = Path(__file__).parent / ".etf_data.db"
+HTTP_CACHE_FILE = Path(__file__).parent / ".http_cache.db"
+
+# Successful responses are replayed from HTTP_CACHE_FILE for this long
+# (seconds), keyed on URL path fragment. Anything else goes to the network.
+HTTP_CACHE_TTL = {
+    "/v8/finance/chart/": 86400,
+    "/v10/finance/quoteSummary/": 3600,
+}
 
 TICKERS = ["SPY", "VTI", "QQQ", "IWM", "IWD", "EFA", "VEA", "EEM", "AGG", "TLT", "GLD", "IYR", "DBC"]
 
@@ -19,45 +41,304 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
 }
 
-def init_db():
-    conn = sqlite3.connect(str(DB_FILE))
+# Max tickers in flight per phase — the work is pure network wait, but Yahoo
+# still rate-limits per host, so keep the fan-out bounded.
+CONCURRENCY = 6
+
+# Start-to-start spacing between Yahoo requests, in seconds. AdaptiveDelay
+# doubles it on a 429 and halves it after a run of clean responses.
+REQUEST_DELAY = 0.5
+MIN_REQUEST_DELAY = 0.25
+MAX_REQUEST_DELAY = 60.0
+
+# Re-runs skip metadata fetched more recently than this (seconds).
+INFO_TTL = 86400
+
+def make_session():
+    """Keep-alive session so each pooled connection pays the TLS handshake once.
+    Adapter retries stay off — fetch_one_ticker owns the retry/backoff policy."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=0))
+    session.mount("https://", adapter)
+    return session
+
+SESSION = make_session()
+
+def _loads(raw):
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+def _dumps(obj):
+    if orjson:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:  # e.g. ints beyond 64 bits — let stdlib handle it
+            pass
+    return json.dumps(obj)
+
+_CONN = None
+
+def get_conn():
+    """Open the single connection db() hands out for every read and write.
+    The DB is a re-derivable cache, so trade fsync durability for speed;
+    all but journal_mode are per-connection and must be set on each open."""
+    conn = sqlite3.connect(str(DB_FILE), cached_statements=256)
     conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("""CREATE TABLE IF NOT EXISTS weekly_prices (
-        ticker TEXT, date TEXT, close REAL,
-        PRIMARY KEY (ticker, date))""")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-65536")      # 64 MB page cache
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA mmap_size=268435456")    # 256 MB
+    return conn
+
+@contextmanager
+def db():
+    """Yield the process-wide connection, opening it (with pragmas) on first
+    use. It is the only writer; main() closes it once at exit. The default
+    isolation level is kept so `with conn:` still wraps each phase in one
+    transaction."""
+    global _CONN
+    if _CONN is None:
+        _CONN = get_conn()
+    yield _CONN
+
+def close_db():
+    global _CONN
+    if _CONN is not None:
+        _CONN.close()
+        _CONN = None
+
+def init_db(conn):
+    """Create tables; returns True when weekly_prices starts empty.
+    An empty price table is (re)created without its key (columns as in
+    server.py's DDL otherwise) so the first bulk load appends to a bare
+    heap — finish_bulk_load() adds the unique index afterwards in one
+    sorted pass."""
+    has_rows = False
+    try:
+        has_rows = conn.execute("SELECT 1 FROM weekly_prices LIMIT 1").fetchone() is not None
+    except sqlite3.OperationalError:
+        pass
+    if not has_rows:
+        conn.execute("DROP TABLE IF EXISTS weekly_prices")
+        conn.execute("""CREATE TABLE weekly_prices (
+            ticker TEXT NOT NULL, date TEXT NOT NULL, close REAL NOT NULL)""")
+    elif not any(idx[2] for idx in conn.execute("PRAGMA index_list(weekly_prices)")):
+        # A bulk load was interrupted before its index went in. Tables that
+        # still carry the original PRIMARY KEY already have a unique index.
+        build_price_index(conn)
+    # ticker_info and cph_housing are read by server.py, so they use its
+    # layout; older fetcher-made tables are brought over to it first.
+    migrate_legacy_tables(conn)
     conn.execute("""CREATE TABLE IF NOT EXISTS ticker_info (
-        ticker TEXT PRIMARY KEY, info_json TEXT, updated_at REAL)""")
+        ticker TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL)""")
     conn.execute("""CREATE TABLE IF NOT EXISTS cph_housing (
-        date TEXT PRIMARY KEY, index_val REAL)""")
+        date TEXT PRIMARY KEY, index_value REAL NOT NULL)""")
     conn.commit()
-    conn.close()
-
-def save_prices(rows):
-    conn = sqlite3.connect(str(DB_FILE))
+    return not has_rows
+
+def migrate_legacy_tables(conn):
+    """Convert the fetcher's old ticker_info (info_json) and cph_housing
+    (index_val) to server.py's schema. The JSON text moves over as is —
+    db_load_info reads both that and compressed rows."""
+    info_cols = {r[1] for r in conn.execute("PRAGMA table_info(ticker_info)")}
+    if info_cols and "data" not in info_cols:
+        rows = conn.execute("SELECT ticker, info_json, updated_at FROM ticker_info").fetchall()
+        conn.execute("DROP TABLE ticker_info")
+        conn.execute("""CREATE TABLE ticker_info (
+            ticker TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL)""")
+        conn.executemany(
+            "INSERT INTO ticker_info (ticker, data, updated_at) VALUES (?, ?, ?)",
+            ((t, j, u or 0.0) for t, j, u in rows if j is not None)
+        )
+    housing_cols = {r[1] for r in conn.execute("PRAGMA table_info(cph_housing)")}
+    if "index_val" in housing_cols:
+        conn.execute("ALTER TABLE cph_housing RENAME COLUMN index_val TO index_value")
+
+def build_price_index(conn):
+    """Add the unique (ticker, date) index to a keyless weekly_prices.
+    While the table had no key, a server refresh could have written rows
+    for dates the fetcher also holds; the latest write of each pair wins,
+    as it would have under the key."""
+    conn.execute("""DELETE FROM weekly_prices WHERE rowid NOT IN (
+        SELECT MAX(rowid) FROM weekly_prices GROUP BY ticker, date)""")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_weekly_ticker_date ON weekly_prices(ticker, date)")
+
+def finish_bulk_load(conn, pending):
+    """Insert the deduplicated {(ticker, date): close} rows, then build the
+    unique index the upsert in save_prices relies on. The first INSERT takes
+    the write lock, so nothing else lands between the dedupe and the index."""
     conn.executemany(
-        "INSERT OR REPLACE INTO weekly_prices (ticker, date, close) VALUES (?, ?, ?)",
-        rows
+        "INSERT INTO weekly_prices (ticker, date, close) VALUES (?, ?, ?)",
+        ((t, d, c) for (t, d), c in pending.items())
     )
-    conn.commit()
-    conn.close()
-
-def count_prices(ticker):
-    conn = sqlite3.connect(str(DB_FILE))
+    build_price_index(conn)
+    conn.execute("ANALYZE")
+
+# Upsert only when the close actually changed (e.g. a retroactive
+# adjustment) — avoids REPLACE's delete+insert on every rerun row.
+# Kept as one module-level string so every save_prices call hits the
+# connection's compiled-statement cache.
+PRICE_UPSERT_SQL = (
+    "INSERT INTO weekly_prices (ticker, date, close) VALUES (?, ?, ?) "
+    "ON CONFLICT(ticker, date) DO UPDATE SET close=excluded.close "
+    "WHERE excluded.close != close"
+)
+
+def save_prices(conn, rows):
+    """Queue rows (any iterable) on the caller's transaction — committed by `with conn:`."""
+    conn.executemany(PRICE_UPSERT_SQL, rows)
+
+def count_prices(conn, ticker):
     r = conn.execute("SELECT COUNT(*) FROM weekly_prices WHERE ticker=?", (ticker,)).fetchone()
-    conn.close()
     return r[0] if r else 0
 
-def save_info(ticker, info_dict):
-    conn = sqlite3.connect(str(DB_FILE))
+def has_prices_since(conn, ticker, date_str):
+    """True if the ticker already has a price row dated on/after date_str."""
+    r = conn.execute(
+        "SELECT MAX(date) FROM weekly_prices WHERE ticker=? AND date >= ?",
+        (ticker, date_str)
+    ).fetchone()
+    return bool(r and r[0])
+
+def info_age(conn, ticker):
+    """Seconds since the ticker's metadata was saved, or None if never."""
+    r = conn.execute("SELECT updated_at FROM ticker_info WHERE ticker=?", (ticker,)).fetchone()
+    return time.time() - r[0] if r and r[0] else None
+
+def save_info(conn, ticker, info_dict):
+    """Store metadata as zlib-compressed JSON, the format server.py's
+    db_save_info writes and db_load_info reads."""
     conn.execute(
-        "INSERT OR REPLACE INTO ticker_info (ticker, info_json, updated_at) VALUES (?, ?, ?)",
-        (ticker, json.dumps(info_dict), time.time())
+        "INSERT OR REPLACE INTO ticker_info (ticker, data, updated_at) VALUES (?, ?, ?)",
+        (ticker, zlib.compress(_dumps(info_dict).encode(), 6), time.time())
     )
-    conn.commit()
-    conn.close()
 
-def fetch_chart(ticker, period1, period2, interval="1wk"):
-    """Fetch price data from Yahoo Finance v8 chart API."""
+class AdaptiveDelay:
+    """AIMD-style pacing for one host: request starts are spaced *delay*
+    seconds apart across all in-flight tickers. Single event loop, so no
+    lock is needed."""
+
+    def __init__(self, delay=REQUEST_DELAY, min=MIN_REQUEST_DELAY, max=MAX_REQUEST_DELAY):
+        self.delay, self.min, self.max = delay, min, max
+        self._next = 0.0
+        self._ok = 0
+
+    async def wait(self):
+        now = time.monotonic()
+        wait = self._next - now
+        self._next = max(now, self._next) + self.delay
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def success(self):
+        self._ok += 1
+        if self._ok >= 5:
+            self._ok = 0
+            self.delay = max(self.delay / 2, self.min)
+
+    def throttled(self):
+        self._ok = 0
+        self.delay = min(self.delay * 2, self.max)
+
+_DELAYS = {}
+
+def delay_for(url):
+    """The shared AdaptiveDelay for url's host."""
+    host = urlsplit(url).netloc
+    if host not in _DELAYS:
+        _DELAYS[host] = AdaptiveDelay()
+    return _DELAYS[host]
+
+def retry_after(resp, attempt):
+    """Seconds to wait after a 429: the server's Retry-After (delta-seconds
+    or HTTP-date) when present, otherwise exponential backoff."""
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    if value:
+        try:
+            return max(0, int(value))
+        except ValueError:
+            try:
+                when = email.utils.parsedate_to_datetime(value)
+                return max(0, int(when.timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+    return 15 * 2 ** attempt  # 15s, 30s, 1min, 2min, 4min
+
+_HTTP_CACHE = None
+
+def http_cache():
+    """Open the response cache on first use. It lives in its own file so
+    .etf_data.db stays prices-and-metadata only; like the main DB it is
+    only touched from the event-loop thread."""
+    global _HTTP_CACHE
+    if _HTTP_CACHE is None:
+        _HTTP_CACHE = sqlite3.connect(str(HTTP_CACHE_FILE))
+        _HTTP_CACHE.execute("PRAGMA journal_mode=WAL")
+        _HTTP_CACHE.execute("PRAGMA synchronous=NORMAL")
+        _HTTP_CACHE.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY, body BLOB, fetched_at REAL)""")
+        _HTTP_CACHE.execute("DELETE FROM responses WHERE fetched_at < ?",
+                            (time.time() - max(HTTP_CACHE_TTL.values()),))
+        _HTTP_CACHE.commit()
+    return _HTTP_CACHE
+
+def close_http_cache():
+    global _HTTP_CACHE
+    if _HTTP_CACHE is not None:
+        _HTTP_CACHE.close()
+        _HTTP_CACHE = None
+
+def _cache_ttl(url):
+    for fragment, ttl in HTTP_CACHE_TTL.items():
+        if fragment in url:
+            return ttl
+    return None
+
+def _cached_response(url, body):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.url = url
+    resp._content = body
+    return resp
+
+async def _get(session, url, params=None, use_cache=True, **kwargs):
+    """Run a blocking GET on a worker thread so several tickers can overlap.
+    Fresh cached 200s are returned without touching the network; every
+    real call waits on its host's AdaptiveDelay and reports back to it.
+    A cacheable 200 is only stored once the caller has checked its payload
+    and calls cache_response() — a 200 can still carry an empty result."""
+    ttl = _cache_ttl(url) if use_cache else None
+    key = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+    if ttl:
+        row = http_cache().execute(
+            "SELECT body, fetched_at FROM responses WHERE key=?", (key,)).fetchone()
+        if row and time.time() - row[1] < ttl:
+            return _cached_response(key, row[0])
+
+    delay = delay_for(url)
+    await delay.wait()
+    resp = await asyncio.to_thread(session.get, url, params=params, **kwargs)
+    if resp.status_code == 429:
+        delay.throttled()
+    elif resp.status_code == 200:
+        delay.success()
+        if ttl:
+            resp.cache_key = key
+    return resp
+
+def cache_response(resp):
+    """Store a response _get marked cacheable; no-op for cache hits and
+    uncacheable URLs."""
+    key = getattr(resp, "cache_key", None)
+    if key:
+        with http_cache() as cache:
+            cache.execute("INSERT OR REPLACE INTO responses (key, body, fetched_at) VALUES (?, ?, ?)",
+                          (key, resp.content, time.time()))
+
+async def fetch_chart(ticker, period1, period2, interval="1wk", session=SESSION):
+    """Fetch price data from Yahoo Finance v8 chart API. Returns an iterator
+    of (ticker, date, close) rows, built as the caller consumes them."""
     url = f"https://query2.finance.yahoo.com/v8/finance/chart/{ticker}"
     params = {
         "period1": int(period1),
@@ -65,13 +346,13 @@ def fetch_chart(ticker, period1, period2, interval="1wk"):
         "interval": interval,
         "includeAdjustedClose": "true",
     }
-    resp = requests.get(url, params=params, headers=HEADERS, timeout=30)
+    resp = await _get(session, url, params=params, timeout=30)
     resp.raise_for_status()
-    data = resp.json()
+    data = _loads(resp.content)
 
     result = data.get("chart", {}).get("result")
     if not result:
-        return []
+        return iter(())
 
     chart = result[0]
     timestamps = chart.get("timestamp", [])
@@ -79,194 +360,277 @@ def fetch_chart(ticker, period1, period2, interval="1wk"):
 
     if not closes:
         closes = chart.get("indicators", {}).get("quote", [{}])[0].get("close", [])
+    if timestamps and closes:
+        cache_response(resp)  # an empty chart is retried, not replayed
+
+    # Only the two arrays are needed from here on; let the rest of the
+    # decoded payload and the raw body go before the rows are built.
+    del resp, data, result, chart
+    return iter_chart_rows(ticker, timestamps, closes)
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
 
-    rows = []
+def utc_date(ts):
+    """YYYY-MM-DD of a Unix timestamp in UTC. Day arithmetic on the ordinal
+    skips the tz machinery and the deprecated datetime.utcfromtimestamp."""
+    return date.fromordinal(_EPOCH_ORDINAL + int(ts) // 86400).isoformat()
+
+def iter_chart_rows(ticker, timestamps, closes):
+    """Yield (ticker, date, close) rows, skipping missing/non-positive closes."""
     for ts, close in zip(timestamps, closes):
         if close is not None and close > 0:
-            date_str = datetime.utcfromtimestamp(ts).strftime("%Y-%m-%d")
-            rows.append((ticker, date_str, round(float(close), 4)))
-
-    return rows
+            yield (ticker, utc_date(ts), round(float(close), 4))
 
-def fetch_quote_summary(ticker):
+async def fetch_quote_summary(ticker, session=SESSION):
     """Fetch ticker metadata from Yahoo Finance v10 quoteSummary API."""
     url = f"https://query2.finance.yahoo.com/v10/finance/quoteSummary/{ticker}"
     params = {
         "modules": "financialData,quoteType,defaultKeyStatistics,assetProfile,summaryDetail",
     }
-    resp = requests.get(url, params=params, headers=HEADERS, timeout=30)
+    resp = await _get(session, url, params=params, timeout=30)
     resp.raise_for_status()
-    data = resp.json()
+    data = _loads(resp.content)
 
     result = data.get("quoteSummary", {}).get("result")
     if not result:
         return None
+    cache_response(resp)
+
+    # Flatten all modules into a single dict; {"raw": x, "fmt": ...} wrappers
+    # collapse to x, any other nested dict is dropped. Later modules win.
+    return {
+        k: v["raw"] if isinstance(v, dict) else v
+        for module_data in result
+        for module_vals in module_data.values() if isinstance(module_vals, dict)
+        for k, v in module_vals.items() if not isinstance(v, dict) or "raw" in v
+    }
 
-    # Flatten all modules into a single dict
-    info = {}
-    for module_data in result:
-        for module_name, module_vals in module_data.items():
-            if isinstance(module_vals, dict):
-                for k, v in module_vals.items():
-                    if isinstance(v, dict) and "raw" in v:
-                        info[k] = v["raw"]
-                    elif not isinstance(v, dict):
-                        info[k] = v
-    return info
-
-def wait_for_api():
+async def wait_for_api(session=SESSION):
     """Wait until Yahoo API is accessible (not rate limited)."""
     url = "https://query2.finance.yahoo.com/v8/finance/chart/SPY?range=5d&interval=1d"
     print("  Checking Yahoo Finance API availability...")
     for attempt in range(10):
         try:
-            resp = requests.get(url, headers=HEADERS, timeout=15)
+            resp = await _get(session, url, use_cache=False, timeout=15)
             if resp.status_code == 200:
                 print(f"  ✓ API is available (attempt {attempt+1})")
                 return True
             elif resp.status_code == 429:
                 wait = 60 * (attempt + 1)
                 print(f"  Rate limited (429). Waiting {wait}s... (attempt {attempt+1}/10)")
-                time.sleep(wait)
+                await asyncio.sleep(wait)
             else:
                 print(f"  HTTP {resp.status_code}. Waiting 30s...")
-                time.sleep(30)
+                await asyncio.sleep(30)
         except Exception as e:
             print(f"  Error: {e}. Waiting 30s...")
-            time.sleep(30)
+            await asyncio.sleep(30)
     print("  ✗ Could not reach Yahoo Finance API after all retries.")
     return False
 
-def fetch_one_ticker(ticker, period1, period2, interval="1wk"):
+async def fetch_one_ticker(ticker, period1, period2, interval="1wk", session=SESSION):
     """Fetch one ticker with generous retry logic."""
     for attempt in range(5):
         try:
-            rows = fetch_chart(ticker, period1, period2, interval=interval)
-            if rows:
-                return rows
+            rows = await fetch_chart(ticker, period1, period2, interval=interval, session=session)
+            # Peek one row to tell an empty chart from a real one, then hand
+            # back the rest still unbuilt.
+            first = next(rows, None)
+            if first is not None:
+                return chain((first,), rows)
             else:
-                print(f"    no data on attempt {attempt+1}")
+                print(f"    {ticker}: no data on attempt {attempt+1}")
         except requests.exceptions.HTTPError as e:
             if e.response is not None and e.response.status_code == 429:
-                wait = 120 * (attempt + 1)  # 2min, 4min, 6min, 8min, 10min
-                print(f"    rate limited (429), waiting {wait}s (attempt {attempt+1}/5)...")
-                time.sleep(wait)
+                wait = retry_after(e.response, attempt)
+                print(f"    {ticker}: rate limited (429), waiting {wait}s (attempt {attempt+1}/5)...")
+                await asyncio.sleep(wait)
             else:
-                print(f"    HTTP error: {e} (attempt {attempt+1})")
-                time.sleep(15)
+                print(f"    {ticker}: HTTP error: {e} (attempt {attempt+1})")
+                await asyncio.sleep(15)
         except Exception as e:
-            print(f"    error: {e} (attempt {attempt+1})")
-            time.sleep(15)
+            print(f"    {ticker}: error: {e} (attempt {attempt+1})")
+            await asyncio.sleep(15)
     return None
 
-def main():
-    init_db()
+async def run_phase(jobs, worker):
+    """Run worker(*job) for each job tuple, CONCURRENCY at a time.
+    Request pacing is left to AdaptiveDelay rather than per-ticker sleeps."""
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def slot(job):
+        async with sem:
+            return await worker(*job)
+
+    return await asyncio.gather(*(slot(job) for job in jobs))
+
+async def main():
+    # Size the to_thread() pool to match the fan-out instead of the default
+    # min(32, cpus+4); SQLite writes stay on the loop thread, so the single
+    # connection is never shared across workers.
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=CONCURRENCY, thread_name_prefix="yahoo"))
+    try:
+        with db() as conn:
+            await fetch_all(conn)
+    finally:
+        close_db()
+        close_http_cache()
+
+async def fetch_all(conn):
+    bulk = init_db(conn)
     now = datetime.now()
-    period2 = int(now.timestamp())
+    today = utc_date(now.timestamp())
+    # Day-aligned bounds (end = next UTC midnight) keep the chart URLs, and so
+    # the HTTP cache keys, identical across reruns on the same day.
+    period2 = (int(now.timestamp()) // 86400 + 1) * 86400
     # 35 years back
-    period1_35y = int((now - timedelta(days=35 * 365.25)).timestamp())
+    period1_35y = int((now - timedelta(days=35 * 365.25)).timestamp()) // 86400 * 86400
+    n = len(TICKERS)
 
     print(f"\n  ═══════════════════════════════════════════════════════")
-    print(f"  ETF Data Fetcher — {len(TICKERS)} tickers")
-    print(f"  35-year window: {datetime.utcfromtimestamp(period1_35y).strftime('%Y-%m-%d')} to {now.strftime('%Y-%m-%d')}")
+    print(f"  ETF Data Fetcher — {n} tickers")
+    print(f"  35-year window: {utc_date(period1_35y)} to {now.strftime('%Y-%m-%d')}")
     print(f"  Database: {DB_FILE}")
     print(f"  ═══════════════════════════════════════════════════════\n")
 
     # Pre-flight check
-    if not wait_for_api():
+    if not await wait_for_api():
         print("  Aborting — Yahoo Finance API not reachable.\n")
         return
 
-    # ── Phase 1: Weekly historical prices ──────────────────────────
-    print("\n  Phase 1: Weekly historical prices\n")
+    # ── Phase 1: Weekly history + YTD daily prices ─────────────────
+    # Both charts for a ticker are requested together in one slot, so the
+    # YTD pass no longer needs a loop of its own.
+    print("\n  Phase 1: Weekly history + YTD daily prices\n")
+    ytd_start = int(datetime(now.year, 1, 1).timestamp())
     successes = 0
+    jobs = []
+    # On a fresh DB, rows are collected here (later saves win, as with the
+    # upsert) and written in one go once the phase is done.
+    pending = {}
+
+    def store(rows):
+        """Stream rows into pending or save_prices; returns
+        (count, first_date, last_date) tallied on the way through."""
+        tally = [0, None, None]
+
+        def counted():
+            for row in rows:
+                if tally[0] == 0:
+                    tally[1] = row[1]
+                tally[0] += 1
+                tally[2] = row[1]
+                yield row
+
+        if bulk:
+            pending.update(((t, d), c) for t, d, c in counted())
+        else:
+            save_prices(conn, counted())
+        return tuple(tally)
 
     for i, ticker in enumerate(TICKERS):
-        existing = count_prices(ticker)
-        if existing > 500:
-            print(f"  [{i+1}/{len(TICKERS)}] {ticker}: already has {existing} rows — skipping.")
-            successes += 1
-            continue
-
-        if i > 0:
-            delay = 15
-            print(f"  ... waiting {delay}s ...")
-            time.sleep(delay)
-
-        print(f"  [{i+1}/{len(TICKERS)}] {ticker}: downloading weekly history...")
-        rows = fetch_one_ticker(ticker, period1_35y, period2, interval="1wk")
-        if rows:
-            save_prices(rows)
-            first_date = rows[0][1]
-            last_date = rows[-1][1]
-            print(f"  [{i+1}/{len(TICKERS)}] {ticker}: ✓ {len(rows)} weekly rows ({first_date} to {last_date})")
+        existing = count_prices(conn, ticker)
+        need_weekly = existing <= 500
+        need_ytd = not has_prices_since(conn, ticker, today)
+        if not need_weekly:
+            print(f"  [{i+1}/{n}] {ticker}: already has {existing} rows — skipping weekly.")
             successes += 1
+        if need_weekly or need_ytd:
+            jobs.append((i, ticker, need_weekly, need_ytd))
         else:
-            print(f"  [{i+1}/{len(TICKERS)}] {ticker}: ✗ all attempts failed")
+            print(f"  [{i+1}/{n}] {ticker}: already has today's close — skipping.")
 
-    print(f"\n  Weekly history: {successes}/{len(TICKERS)} succeeded.\n")
-
-    # ── Phase 2: YTD daily prices ──────────────────────────────────
-    print("  Phase 2: YTD daily prices\n")
-    ytd_start = int(datetime(now.year, 1, 1).timestamp())
-
-    for i, ticker in enumerate(TICKERS):
-        if i > 0:
-            time.sleep(8)
+    async def ytd(ticker):
         try:
-            rows = fetch_chart(ticker, ytd_start, period2, interval="1d")
-            if rows:
-                save_prices(rows)
-                print(f"  [{i+1}/{len(TICKERS)}] {ticker}: {len(rows)} YTD daily rows")
+            return await fetch_chart(ticker, ytd_start, period2, interval="1d")
         except Exception as e:
-            print(f"  [{i+1}/{len(TICKERS)}] {ticker}: YTD failed: {e}")
+            return e
+
+    async def prices(i, ticker, need_weekly, need_ytd):
+        if need_weekly:
+            print(f"  [{i+1}/{n}] {ticker}: downloading weekly history...")
+        weekly_rows, ytd_rows = await asyncio.gather(
+            fetch_one_ticker(ticker, period1_35y, period2, interval="1wk") if need_weekly else asyncio.sleep(0),
+            ytd(ticker) if need_ytd else asyncio.sleep(0),
+        )
+        ok = False
+        if need_weekly:
+            if weekly_rows:
+                count, first_date, last_date = store(weekly_rows)
+                print(f"  [{i+1}/{n}] {ticker}: ✓ {count} weekly rows ({first_date} to {last_date})")
+                ok = True
+            else:
+                print(f"  [{i+1}/{n}] {ticker}: ✗ all attempts failed")
+        # Daily rows go in after the weekly ones so they win on shared dates.
+        if isinstance(ytd_rows, Exception):
+            print(f"  [{i+1}/{n}] {ticker}: YTD failed: {ytd_rows}")
+        elif ytd_rows is not None:
+            count = store(ytd_rows)[0]
+            if count:
+                print(f"  [{i+1}/{n}] {ticker}: {count} YTD daily rows")
+        return ok
+
+    with conn:
+        successes += sum(await run_phase(jobs, prices))
+        if bulk:
+            finish_bulk_load(conn, pending)
+    print(f"\n  Weekly history: {successes}/{n} succeeded.\n")
+
+    # ── Phase 2: Ticker metadata ───────────────────────────────────
+    print(f"\n  Phase 2: Ticker metadata\n")
+    jobs = []
 
-    # ── Phase 3: Ticker metadata ───────────────────────────────────
-    print(f"\n  Phase 3: Ticker metadata\n")
     for i, ticker in enumerate(TICKERS):
-        if i > 0:
-            time.sleep(10)
+        age = info_age(conn, ticker)
+        if age is not None and age < INFO_TTL:
+            print(f"  [{i+1}/{n}] {ticker}: metadata fresh ({age/3600:.1f}h old) — skipping.")
+        else:
+            jobs.append((i, ticker))
+
+    async def metadata(i, ticker):
         for attempt in range(3):
             try:
-                info = fetch_quote_summary(ticker)
+                info = await fetch_quote_summary(ticker)
                 if info:
-                    save_info(ticker, info)
+                    save_info(conn, ticker, info)
                     price = info.get("regularMarketPrice") or info.get("currentPrice")
                     name = info.get("shortName") or info.get("longName") or "?"
-                    print(f"  [{i+1}/{len(TICKERS)}] {ticker}: ✓ {name} (${price})")
+                    print(f"  [{i+1}/{n}] {ticker}: ✓ {name} (${price})")
                     break
                 else:
-                    print(f"  [{i+1}/{len(TICKERS)}] {ticker}: no metadata returned (attempt {attempt+1})")
+                    print(f"  [{i+1}/{n}] {ticker}: no metadata returned (attempt {attempt+1})")
             except requests.exceptions.HTTPError as e:
                 if e.response is not None and e.response.status_code == 429:
-                    wait = 120
-                    print(f"  [{i+1}/{len(TICKERS)}] {ticker}: rate limited, waiting {wait}s...")
-                    time.sleep(wait)
+                    wait = retry_after(e.response, attempt)
+                    print(f"  [{i+1}/{n}] {ticker}: rate limited, waiting {wait}s...")
+                    await asyncio.sleep(wait)
                 else:
-                    print(f"  [{i+1}/{len(TICKERS)}] {ticker}: HTTP error: {e}")
+                    print(f"  [{i+1}/{n}] {ticker}: HTTP error: {e}")
                     break
             except Exception as e:
-                print(f"  [{i+1}/{len(TICKERS)}] {ticker}: error: {e}")
+                print(f"  [{i+1}/{n}] {ticker}: error: {e}")
                 break
 
+    with conn:
+        await run_phase(jobs, metadata)
+
     # ── Summary ────────────────────────────────────────────────────
-    conn = sqlite3.connect(str(DB_FILE))
     total = conn.execute("SELECT COUNT(*) FROM weekly_prices").fetchone()[0]
     print(f"\n  ═══════════════════════════════════════════════════════")
     print(f"  COMPLETE — {total} total price rows in database")
     print(f"  ═══════════════════════════════════════════════════════\n")
     print(f"  Per-ticker breakdown:")
+    stats = {row[0]: row[1:] for row in conn.execute(
+        "SELECT ticker, MIN(date), MAX(date), COUNT(*) FROM weekly_prices GROUP BY ticker"
+    )}
     for ticker in TICKERS:
-        r = conn.execute(
-            "SELECT MIN(date), MAX(date), COUNT(*) FROM weekly_prices WHERE ticker=?",
-            (ticker,)
-        ).fetchone()
-        if r and r[2] > 0:
+        r = stats.get(ticker, (None, None, 0))
+        if r[2] > 0:
             print(f"    {ticker:6s}: {r[2]:5d} rows  |  {r[0]} to {r[1]}")
         else:
             print(f"    {ticker:6s}:     0 rows  |  NO DATA")
-    conn.close()
     print()
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
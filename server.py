@@ -2,27 +2,86 @@
 """ETF Compare — Flask backend with SQLite persistence, Yahoo Finance,
 Alpha Vantage fallback, and Statistics Denmark live housing data."""
 
+import atexit
 import json
 import math
 import os
+import random
 import sqlite3
 import time
 import threading
 import traceback
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
+from typing import NamedTuple
 
+import numpy as np
 import requests as http_requests
 import yfinance as yf
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from flask import Flask, jsonify, request, send_from_directory
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson  # optional: faster info blobs, disk cache and API responses
+except ImportError:
+    orjson = None
+
+_ORJSON_OPTS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+def _json_dumps(obj):
+    """Serialize info dicts and the disk cache; non-JSON values are
+    stringified like default=str."""
+    if orjson:
+        try:
+            return orjson.dumps(obj, default=str, option=_ORJSON_OPTS).decode()
+        except TypeError:  # e.g. ints beyond 64 bits — let stdlib handle it
+            pass
+    return json.dumps(obj, default=str)
+
+
+def _json_loads(s):
+    return orjson.loads(s) if orjson else json.loads(s)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson; keeps the default provider's
+    sorted keys and falls back to it for anything orjson can't encode."""
+
+    def dumps(self, obj, **kwargs):
+        opts = _ORJSON_OPTS | orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            opts |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=opts).decode()
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 app = Flask(__name__, static_folder=".", static_url_path="")
+if orjson:
+    app.json = OrjsonProvider(app)
 
 # ── Configuration ─────────────────────────────────────────────────────
 ALPHA_VANTAGE_API_KEY = os.environ.get("ALPHA_VANTAGE_API_KEY", "")
 DB_FILE = Path(__file__).parent / ".etf_data.db"
 CACHE_FILE = Path(__file__).parent / ".etf_cache.json"
-CACHE_TTL = 604800  # 7 days — skip background fetch if DB data is less than 1 week old
+# Per-dataset staleness, matched to how often each source actually changes.
+DATA_TTL = {
+    "weekly_prices": 3 * 86400,   # ETF closes — last Friday's close is still current on Monday
+    "index_backers": 7 * 86400,   # historical index series, rarely revised
+    "ticker_info":   3 * 86400,   # market cap / price move daily, the rest is stable
+    "cph_housing":  80 * 86400,   # Statistics Denmark publishes quarterly
+}
+YAHOO_WORKERS = 4   # concurrent Yahoo fetches — network-bound, but Yahoo rate-limits per IP
 
 # ── Tickers & static metadata ───────────────────────────────────────
 ETF_META = {
@@ -46,8 +105,9 @@ ETF_META = {
     "CPH-RE": {"index": "Copenhagen Apartment Index", "category": "Real Estate — Copenhagen", "description": "Copenhagen residential apartment prices (price per m²) + estimated ~3.5% annual gross rent yield. Price data from Statistics Denmark / Finance Denmark. Rent yield is an approximation.", "static": True},
 }
 
-TICKERS = [t for t in ETF_META if not ETF_META[t].get("static")]
-STATIC_TICKERS = [t for t in ETF_META if ETF_META[t].get("static")]
+TICKERS = tuple(t for t in ETF_META if not ETF_META[t].get("static"))
+STATIC_TICKERS = tuple(t for t in ETF_META if ETF_META[t].get("static"))
+_TICKER_PLACEHOLDERS = ",".join("?" * len(TICKERS))
 
 # ── Index backers: older tickers to extend ETF data before inception ──
 # Maps ETF ticker → ordered list of (yahoo_ticker, description, includes_dividends).
@@ -100,21 +160,57 @@ _cache = {
     "time": 0,
     "fetched_at": None,
     "source": "fallback",
-    "updating": False,
 }
 
+# Held for the duration of fetch_live_data(); routes only ever test it.
+_refresh_lock = threading.Lock()
+REFRESH_CHECK_INTERVAL = DATA_TTL["weekly_prices"] // 24  # seconds between staleness checks
+REFRESH_MIN_AGE = 10 * 60  # /api/refresh is a no-op this long after a successful live fetch
+# time.time() of the last fetch_live_data() that completed. _cache["time"]
+# can't stand in for it: startup sets that from the disk cache or DB, however
+# old the data behind them is.
+_last_live_fetch = 0.0
+
 
 # ══════════════════════════════════════════════════════════════════════
 #  SQLite Database Layer
 # ══════════════════════════════════════════════════════════════════════
 
+_tls = threading.local()
+
+
 def _db():
-    """Get a new SQLite connection (thread-safe — one connection per call)."""
+    """Get this thread's SQLite connection, opening it on first use.
+    sqlite3 connections must not be shared across threads, so each Flask
+    worker / background thread keeps its own. One-off threads close it on
+    the way out (_close_db), the main thread at exit; pool workers' go with
+    their thread-locals. journal_mode persists in the file; the rest are
+    per-connection."""
+    conn = getattr(_tls, "conn", None)
+    if conn is not None:
+        return conn
     conn = sqlite3.connect(str(DB_FILE))
-    conn.execute("PRAGMA journal_mode=WAL")
+    _tls.conn = conn
+    conn.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-65536;
+        PRAGMA mmap_size=268435456;
+        PRAGMA busy_timeout=5000;
+    """)
     return conn
 
 
+@atexit.register
+def _close_db():
+    """Close the calling thread's connection; the next _db() reopens it."""
+    conn = getattr(_tls, "conn", None)
+    if conn is not None:
+        conn.close()
+        _tls.conn = None
+
+
 def init_db():
     """Create tables if they don't exist."""
     conn = _db()
@@ -127,51 +223,49 @@ def init_db():
         );
         CREATE TABLE IF NOT EXISTS ticker_info (
             ticker     TEXT PRIMARY KEY,
-            data       TEXT NOT NULL,
+            data       BLOB NOT NULL,   -- zlib-compressed JSON (see _pack_info)
             updated_at REAL NOT NULL
         );
         CREATE TABLE IF NOT EXISTS cph_housing (
             date        TEXT PRIMARY KEY,
             index_value REAL NOT NULL
         );
+        -- Makes SELECT date, close ... WHERE ticker=? ORDER BY date an
+        -- index-only scan (the PK index doesn't carry close).
+        CREATE INDEX IF NOT EXISTS idx_wp_cover ON weekly_prices(ticker, date, close);
     """)
     conn.commit()
-    conn.close()
+    conn.execute("PRAGMA optimize")
 
 
 def db_last_date(ticker):
     """Most recent price date for a ticker, or None."""
     conn = _db()
     r = conn.execute("SELECT MAX(date) FROM weekly_prices WHERE ticker=?", (ticker,)).fetchone()
-    conn.close()
     return r[0] if r and r[0] else None
 
 
-def db_price_count(ticker):
-    """Number of stored price rows for a ticker."""
+def db_price_stats():
+    """{ticker: (row_count, last_date)} for every stored ticker, in one query."""
     conn = _db()
-    r = conn.execute("SELECT COUNT(*) FROM weekly_prices WHERE ticker=?", (ticker,)).fetchone()
-    conn.close()
-    return r[0] if r else 0
+    return {t: (n, last) for t, n, last in conn.execute(
+        "SELECT ticker, COUNT(*), MAX(date) FROM weekly_prices GROUP BY ticker"
+    )}
 
 
 def db_total_prices():
     """Total price rows across all tickers."""
     conn = _db()
     r = conn.execute("SELECT COUNT(*) FROM weekly_prices").fetchone()
-    conn.close()
     return r[0] if r else 0
 
 
+_NEWEST_SQL = f"SELECT MAX(date) FROM weekly_prices WHERE ticker IN ({_TICKER_PLACEHOLDERS})"
+
+
 def db_newest_date():
     """Most recent price date across ALL tickers (not backers), or None."""
-    conn = _db()
-    placeholders = ",".join("?" for _ in TICKERS)
-    r = conn.execute(
-        f"SELECT MAX(date) FROM weekly_prices WHERE ticker IN ({placeholders})",
-        list(TICKERS)
-    ).fetchone()
-    conn.close()
+    r = _db().execute(_NEWEST_SQL, TICKERS).fetchone()
     return r[0] if r and r[0] else None
 
 
@@ -181,20 +275,24 @@ def db_data_age_days():
     if not newest:
         return None
     try:
-        newest_dt = datetime.strptime(newest[:10], "%Y-%m-%d")
+        newest_dt = _parse_iso(newest)
         return (datetime.now() - newest_dt).days
     except Exception:
         return None
 
 
+# Shared SQL strings so every batch hits the connection's statement cache.
+_PRICE_INSERT_SQL = "INSERT OR REPLACE INTO weekly_prices VALUES (?,?,?)"
+_HOUSING_INSERT_SQL = "INSERT OR REPLACE INTO cph_housing VALUES (?,?)"
+
+
 def db_save_prices(rows):
-    """Save list of (ticker, date_str, close) to weekly_prices."""
+    """Save (ticker, date_str, close) rows — any iterable — to weekly_prices
+    in one transaction. Callers batch across tickers where they can."""
     if not rows:
         return
-    conn = _db()
-    conn.executemany("INSERT OR REPLACE INTO weekly_prices VALUES (?,?,?)", rows)
-    conn.commit()
-    conn.close()
+    with _db() as conn:
+        conn.executemany(_PRICE_INSERT_SQL, rows)
 
 
 def db_load_prices(ticker):
@@ -204,67 +302,200 @@ def db_load_prices(ticker):
         "SELECT date, close FROM weekly_prices WHERE ticker=? ORDER BY date",
         (ticker,)
     ).fetchall()
-    conn.close()
     return rows
 
 
+class PriceSeries(NamedTuple):
+    """A price history as parallel arrays, ordered by date: dates as
+    datetime64[D] and closes as float64. Parsed once at load time and
+    shared by all the return/risk helpers."""
+    dates: np.ndarray
+    closes: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (date_str, close) rows."""
+        return cls(np.array([r[0] for r in rows], dtype="datetime64[D]"),
+                   np.array([r[1] for r in rows], dtype=np.float64))
+
+    def frozen(self):
+        """Mark both arrays read-only, so a memoized instance can be shared."""
+        self.dates.flags.writeable = False
+        self.closes.flags.writeable = False
+        return self
+
+
+# Write generation of the DB file, for keying the memoized series below.
+# PRAGMA data_version only changes for commits made by *other* connections,
+# so it is polled on a connection of its own that never writes: then every
+# commit counts — from any thread here, or from fetch_data.py in another
+# process.
+_gen_conn = None
+_gen_lock = threading.Lock()
+_data_version = None
+_generation = 0
+
+
+def db_generation():
+    """Counter that moves on whenever anything has been committed to the DB
+    since the previous call."""
+    global _gen_conn, _data_version, _generation
+    with _gen_lock:
+        if _gen_conn is None:
+            _gen_conn = sqlite3.connect(str(DB_FILE), check_same_thread=False)
+        version = _gen_conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != _data_version:
+            _data_version = version
+            _generation += 1
+        return _generation
+
+
+# compute_from_db and compute_correlation_map both read every series, so
+# the parsed arrays are memoized per write generation: a lookup after any
+# commit misses, and a load that raced a commit is stored under the
+# generation it started in, which no later lookup asks for. db_load_prices
+# stays uncached: the splice reads it mid-transaction.
+@lru_cache(maxsize=64)
+def _load_series(ticker, generation):
+    return PriceSeries.from_rows(db_load_prices(ticker)).frozen()
+
+
+def db_load_series(ticker):
+    """Load a ticker's prices as a (shared, read-only) PriceSeries."""
+    return _load_series(ticker, db_generation())
+
+
+def db_load_all_prices(tickers):
+    """{ticker: PriceSeries} for *tickers*, through the db_load_series cache.
+    Each miss is its own indexed per-ticker query: on this schema that beats
+    one big IN (...) ORDER BY ticker, date, which has to return (and group
+    on) a ticker string per row."""
+    generation = db_generation()
+    return {t: _load_series(t, generation) for t in tickers}
+
+
+@lru_cache(maxsize=1)
+def _load_housing_series(generation):
+    return PriceSeries.from_rows(db_load_housing()).frozen()
+
+
+def db_load_housing_series():
+    """Load the CPH housing index as a (shared, read-only) PriceSeries."""
+    return _load_housing_series(db_generation())
+
+
+# ticker -> ((info_dict, updated_at), loaded_at). Sits in front of
+# ticker_info so compute_from_db and the refresh loops don't re-read and
+# re-parse the same JSON blobs; entries are dropped whenever info is saved.
+CACHE_TTL_INFO = 60  # seconds
+_info_cache = {}
+_info_cache_lock = threading.Lock()
+
+
+def _pack_info(info_dict):
+    """Info dicts are stored zlib-compressed: the flattened Yahoo metadata is
+    a few KB of repetitive keys and numbers and shrinks several-fold."""
+    return zlib.compress(_json_dumps(info_dict).encode(), 6)
+
+
+def _unpack_info(data):
+    """Inverse of _pack_info; rows saved before compression hold JSON text."""
+    return _json_loads(zlib.decompress(data) if isinstance(data, bytes) else data)
+
+
 def db_save_info(ticker, info_dict):
-    """Save ticker info dict as JSON with timestamp."""
-    conn = _db()
-    conn.execute(
-        "INSERT OR REPLACE INTO ticker_info VALUES (?,?,?)",
-        (ticker, json.dumps(info_dict, default=str), time.time())
-    )
-    conn.commit()
-    conn.close()
+    """Save ticker info dict as compressed JSON with timestamp."""
+    with _db() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO ticker_info (ticker, data, updated_at) VALUES (?,?,?)",
+            (ticker, _pack_info(info_dict), time.time())
+        )
+    with _info_cache_lock:
+        _info_cache.pop(ticker, None)
 
 
 def db_load_info(ticker):
-    """Load ticker info. Returns (dict, updated_at) or (None, 0)."""
+    """Load ticker info. Returns (dict, updated_at) or (None, 0).
+    The dict may be shared with other callers — treat it as read-only."""
+    now = time.time()
+    with _info_cache_lock:
+        hit = _info_cache.get(ticker)
+    if hit and now - hit[1] < CACHE_TTL_INFO:
+        return hit[0]
     conn = _db()
     r = conn.execute("SELECT data, updated_at FROM ticker_info WHERE ticker=?", (ticker,)).fetchone()
-    conn.close()
+    result = (None, 0)
     if r:
         try:
-            return json.loads(r[0]), r[1]
+            result = (_unpack_info(r[0]), r[1])
         except Exception:
-            return None, 0
-    return None, 0
+            pass
+    with _info_cache_lock:
+        _info_cache[ticker] = (result, now)
+    return result
 
 
 def db_save_housing(rows):
-    """Save list of (date_str, index_value) to cph_housing."""
+    """Save (date_str, index_value) rows — any iterable — to cph_housing."""
     if not rows:
         return
-    conn = _db()
-    conn.executemany("INSERT OR REPLACE INTO cph_housing VALUES (?,?)", rows)
-    conn.commit()
-    conn.close()
+    with _db() as conn:
+        conn.executemany(_HOUSING_INSERT_SQL, rows)
 
 
 def db_load_housing():
     """Load all (date_str, index_value), ordered by date."""
     conn = _db()
     rows = conn.execute("SELECT date, index_value FROM cph_housing ORDER BY date").fetchall()
-    conn.close()
     return rows
 
 
 def db_last_housing_date():
     conn = _db()
     r = conn.execute("SELECT MAX(date) FROM cph_housing").fetchone()
-    conn.close()
     return r[0] if r and r[0] else None
 
 
+def stale_datasets():
+    """Names of DATA_TTL datasets that are missing or older than their TTL.
+    Backers are covered by the weekly_prices refresh, so aren't checked here."""
+    stale = []
+    age = db_data_age_days()
+    if age is None or age > DATA_TTL["weekly_prices"] // 86400:
+        stale.append("weekly_prices")
+
+    n, oldest = _db().execute(
+        f"SELECT COUNT(*), MIN(updated_at) FROM ticker_info WHERE ticker IN ({_TICKER_PLACEHOLDERS})",
+        TICKERS
+    ).fetchone()
+    if n < len(TICKERS) or time.time() - oldest > DATA_TTL["ticker_info"]:
+        stale.append("ticker_info")
+
+    last = db_last_housing_date()
+    try:
+        housing_age = (datetime.now() - _parse_iso(last)).days if last else None
+    except Exception:
+        housing_age = None
+    if housing_age is None or housing_age >= DATA_TTL["cph_housing"] // 86400:
+        stale.append("cph_housing")
+    return stale
+
+
 # ══════════════════════════════════════════════════════════════════════
 #  Math / Computation Helpers
 # ══════════════════════════════════════════════════════════════════════
 
+@lru_cache(maxsize=4096)
+def _parse_iso(s):
+    """Parse the YYYY-MM-DD prefix of *s* (C fast path, memoized — the same
+    price and inception dates are parsed over and over)."""
+    return datetime.fromisoformat(s[:10])
+
+
 def annualized_return(start_price, end_price, years):
     if not start_price or start_price == 0 or years <= 0:
         return 0.0
-    return (math.pow(end_price / start_price, 1.0 / years) - 1) * 100
+    return ((end_price / start_price) ** (1.0 / years) - 1) * 100
 
 
 def cumulative_return(annualized_pct, years):
@@ -272,7 +503,7 @@ def cumulative_return(annualized_pct, years):
     E.g. 10% annualized over 10 years → ((1.10)^10 − 1) × 100 ≈ 159.37%"""
     if annualized_pct is None:
         return None
-    return round((math.pow(1 + annualized_pct / 100, years) - 1) * 100, 1)
+    return round(((1 + annualized_pct / 100) ** years - 1) * 100, 1)
 
 
 def best_annualized_return(entry):
@@ -286,6 +517,23 @@ def best_annualized_return(entry):
     return None
 
 
+# (entry field prefix, years) for the fixed-horizon returns
+_RETURN_PERIODS = (("fiveYear", 5), ("tenYear", 10), ("fifteenYear", 15),
+                   ("twentyYear", 20), ("twentyFiveYear", 25))
+
+
+def _set_cumulative_returns(entry, since_1990=True):
+    """Fill entry's fixed-horizon *CumulativeReturn fields from its annualized
+    *Return fields, plus the 40Y projection off best_annualized_return.
+    With *since_1990*, also since1990CumulativeReturn from since1990Return/Years."""
+    for key, years in _RETURN_PERIODS:
+        entry[f"{key}CumulativeReturn"] = cumulative_return(entry.get(f"{key}Return"), years)
+    if since_1990:
+        r = entry.get("since1990Return")
+        entry["since1990CumulativeReturn"] = cumulative_return(r, entry.get("since1990Years")) if r else None
+    entry["fortyYearCumulativeReturn"] = cumulative_return(best_annualized_return(entry), 40)
+
+
 RISK_FREE_RATE = 4.0  # annualized %, approximate current T-bill yield
 
 # Approximate annualized standard deviations (%) for fallback use.
@@ -305,24 +553,21 @@ FALLBACK_STDDEV = {
 CPH_RENT_YIELD = 3.5  # annualized %
 
 
-def calc_annualized_stddev(prices):
-    """Compute annualized standard deviation from a list of (date, price) pairs.
-    Uses weekly returns, annualized by √52."""
-    if len(prices) < 52:
+def calc_annualized_stddev(prices, periods_per_year=52, min_points=52, min_returns=26):
+    """Compute annualized standard deviation from a PriceSeries.
+    Uses period-over-period returns (weekly by default), annualized by
+    √periods_per_year."""
+    closes = prices.closes
+    if len(closes) < min_points:
         return None
-    # Weekly returns
-    returns = []
-    for k in range(1, len(prices)):
-        _, c = prices[k]
-        _, prev_c = prices[k - 1]
-        if prev_c > 0:
-            returns.append((c - prev_c) / prev_c)
-    if len(returns) < 26:
+    # Period returns (skipping steps off a non-positive close)
+    prev, cur = closes[:-1], closes[1:]
+    ok = prev > 0
+    returns = (cur[ok] - prev[ok]) / prev[ok]
+    if len(returns) < min_returns:
         return None
-    mean = sum(returns) / len(returns)
-    var = sum((r - mean) ** 2 for r in returns) / (len(returns) - 1)
-    weekly_std = math.sqrt(var)
-    return round(weekly_std * math.sqrt(52) * 100, 2)  # annualized %
+    period_std = float(returns.std(ddof=1))
+    return round(period_std * math.sqrt(periods_per_year) * 100, 2)  # annualized %
 
 
 def calc_sharpe(annualized_return_pct, stddev_pct, risk_free=RISK_FREE_RATE):
@@ -332,46 +577,44 @@ def calc_sharpe(annualized_return_pct, stddev_pct, risk_free=RISK_FREE_RATE):
     return round((annualized_return_pct - risk_free) / stddev_pct, 2)
 
 
-# Enrich FALLBACK_DATA with computed cumulative returns for each period
-for _fb_entry in FALLBACK_DATA:
-    _fb_entry["fiveYearCumulativeReturn"] = cumulative_return(_fb_entry.get("fiveYearReturn"), 5)
-    _fb_entry["tenYearCumulativeReturn"] = cumulative_return(_fb_entry.get("tenYearReturn"), 10)
-    _fb_entry["fifteenYearCumulativeReturn"] = cumulative_return(_fb_entry.get("fifteenYearReturn"), 15)
-    _fb_entry["twentyYearCumulativeReturn"] = cumulative_return(_fb_entry.get("twentyYearReturn"), 20)
-    _fb_entry["twentyFiveYearCumulativeReturn"] = cumulative_return(_fb_entry.get("twentyFiveYearReturn"), 25)
-    _fb_entry["fortyYearCumulativeReturn"] = cumulative_return(best_annualized_return(_fb_entry), 40)
-    _fb_std = FALLBACK_STDDEV.get(_fb_entry["ticker"])
-    _fb_entry["annualizedStdDev"] = _fb_std
-    _fb_entry["sharpeRatio"] = calc_sharpe(_fb_entry.get("tenYearReturn"), _fb_std)
+def _enrich_fallback_entry(entry, now):
+    """Add computed cumulative returns, std dev / Sharpe and the since-inception
+    and since-1990 estimates to one FALLBACK_DATA entry. Only the *Years
+    fields depend on *now*."""
+    best = best_annualized_return(entry)
+    _set_cumulative_returns(entry, since_1990=False)
+    std = FALLBACK_STDDEV.get(entry["ticker"])
+    entry["annualizedStdDev"] = std
+    entry["sharpeRatio"] = calc_sharpe(entry.get("tenYearReturn"), std)
     # Estimate since-inception: use best available return as proxy
-    _fb_entry["sinceInceptionReturn"] = best_annualized_return(_fb_entry)
-    _fb_ds = _fb_entry.get("dataStart")
-    if _fb_ds:
-        try:
-            _fb_yrs = (datetime.now() - datetime.strptime(str(_fb_ds)[:10], "%Y-%m-%d")).days / 365.25
-            _fb_entry["sinceInceptionYears"] = round(_fb_yrs, 1)
-        except Exception:
-            _fb_entry["sinceInceptionYears"] = 0
-    else:
-        _fb_entry["sinceInceptionYears"] = 0
-    # Estimate since-1990 return: use since-inception if data starts before 1990
-    _fb_entry["since1990Return"] = None
-    _fb_entry["since1990Years"] = 0
-    _fb_entry["since1990CumulativeReturn"] = None
-    if _fb_ds and str(_fb_ds)[:4] <= "1990":
-        _fb_entry["since1990Return"] = best_annualized_return(_fb_entry)
+    entry["sinceInceptionReturn"] = best
+    ds = entry.get("dataStart")
+    entry["sinceInceptionYears"] = 0
+    if ds:
         try:
-            _1990_yrs = (datetime.now() - datetime(1990, 1, 1)).days / 365.25
-            _fb_entry["since1990Years"] = round(_1990_yrs, 1)
-            _fb_entry["since1990CumulativeReturn"] = cumulative_return(
-                _fb_entry["since1990Return"], _fb_entry["since1990Years"])
+            yrs = (now - _parse_iso(str(ds))).days / 365.25
+            entry["sinceInceptionYears"] = round(yrs, 1)
         except Exception:
             pass
+    # Estimate since-1990 return: use since-inception if data starts before 1990
+    entry["since1990Return"] = None
+    entry["since1990Years"] = 0
+    entry["since1990CumulativeReturn"] = None
+    if ds and str(ds)[:4] <= "1990":
+        entry["since1990Return"] = best
+        entry["since1990Years"] = round((now - datetime(1990, 1, 1)).days / 365.25, 1)
+        entry["since1990CumulativeReturn"] = cumulative_return(best, entry["since1990Years"])
+
+
+_fb_now = datetime.now()
+for _fb_entry in FALLBACK_DATA:
+    _enrich_fallback_entry(_fb_entry, _fb_now)
+FALLBACK_BY_TICKER = {e["ticker"]: e for e in FALLBACK_DATA}
 
 
 def _fmt_dd_date(d):
     try:
-        return datetime.strptime(d[:10], "%Y-%m-%d").strftime("%b %Y")
+        return _parse_iso(d).strftime("%b %Y")
     except Exception:
         return d
 
@@ -389,16 +632,40 @@ DRAWDOWN_LABELS = {
     (2023, 2024): "Rate hikes / inflation",
 }
 
+# Expanded to {year: label}; setdefault keeps the first matching range, as
+# the original in-order scan did.
+_YEAR_LABEL = {}
+for (_y1, _y2), _label in DRAWDOWN_LABELS.items():
+    for _yr in range(_y1, _y2 + 1):
+        _YEAR_LABEL.setdefault(_yr, _label)
+
+
 def _label_drawdown(trough_date_str):
     """Try to assign a known event label to a drawdown based on the trough date."""
     try:
-        yr = int(trough_date_str[:4])
+        return _YEAR_LABEL.get(int(trough_date_str[:4]), "")
     except Exception:
         return ""
-    for (y1, y2), label in DRAWDOWN_LABELS.items():
-        if y1 <= yr <= y2:
-            return label
-    return ""
+
+
+def _drawdown_events(closes, min_dd=-0.05):
+    """Every peak → trough event in *closes* (a float sequence) deeper than
+    *min_dd*, in chronological order, as parallel arrays
+    (drawdown, peak_idx, trough_idx).
+    A segment starts at each strictly new running high and its trough is the
+    first lowest point before the next one; only the few segments that
+    qualify are argmin-scanned."""
+    px = np.asarray(closes, dtype=np.float64)
+    peaks = np.maximum.accumulate(px)
+    dd = (px - peaks) / peaks
+    starts = np.flatnonzero(np.concatenate(([True], px[1:] > peaks[:-1])))
+    ends = np.append(starts[1:], len(px))
+    seg_min = np.minimum.reduceat(dd, starts)
+    deep = np.flatnonzero(seg_min < min_dd)
+    peak_idx = starts[deep]
+    trough_idx = np.array([s + np.argmin(dd[s:e]) for s, e in zip(peak_idx, ends[deep])],
+                          dtype=np.intp)
+    return seg_min[deep], peak_idx, trough_idx
 
 
 def calc_drawdowns(prices):
@@ -409,169 +676,116 @@ def calc_drawdowns(prices):
         "maxDdPeak": None, "maxDdTrough": None,
         "secondDrawdown": None, "secondDrawdownPeriod": None, "secondDrawdownLabel": "",
     }
-    if len(prices) < 2:
+    if len(prices.closes) < 2:
         return result
 
     # Step 1: identify ALL drawdown events (peak → trough pairs)
-    drawdown_events = []
-    peak = prices[0][1]
-    cur_peak_date = prices[0][0]
-    cur_dd = 0.0
-    cur_trough_date = prices[0][0]
-
-    for date_str, price in prices:
-        if price > peak:
-            # When a new peak is hit, record the previous drawdown if significant
-            if cur_dd < -0.05:  # Only track drawdowns > 5%
-                drawdown_events.append((cur_dd, cur_peak_date, cur_trough_date))
-            peak = price
-            cur_peak_date = date_str
-            cur_dd = 0.0
-            cur_trough_date = date_str
-        dd = (price - peak) / peak
-        if dd < cur_dd:
-            cur_dd = dd
-            cur_trough_date = date_str
-
-    # Record the last drawdown if we haven't recovered
-    if cur_dd < -0.05:
-        drawdown_events.append((cur_dd, cur_peak_date, cur_trough_date))
-
-    if not drawdown_events:
+    depths, peak_idx, trough_idx = _drawdown_events(prices.closes)
+    if not len(depths):
         return result
-
-    # Sort by drawdown severity (most negative first)
-    drawdown_events.sort(key=lambda x: x[0])
-
-    # Best (worst) drawdown
-    best = drawdown_events[0]
-    result["maxDrawdown"] = round(best[0] * 100, 2)
-    result["drawdownPeriod"] = f"{_fmt_dd_date(best[1])}–{_fmt_dd_date(best[2])}"
-    result["drawdownLabel"] = _label_drawdown(best[2])
-    result["maxDdPeak"] = best[1]
-    result["maxDdTrough"] = best[2]
+    dates = prices.dates
+    trough_years = dates[trough_idx].astype("datetime64[Y]").astype(np.int64) + 1970
+
+    # Best (worst) drawdown; argmin takes the earliest on ties
+    b = int(depths.argmin())
+    peak, trough = str(dates[peak_idx[b]]), str(dates[trough_idx[b]])
+    result["maxDrawdown"] = round(float(depths[b]) * 100, 2)
+    result["drawdownPeriod"] = f"{_fmt_dd_date(peak)}–{_fmt_dd_date(trough)}"
+    result["drawdownLabel"] = _label_drawdown(trough)
+    result["maxDdPeak"] = peak
+    result["maxDdTrough"] = trough
 
     # Second-largest drawdown: must be at least 2 years apart from the first trough
-    try:
-        best_trough_year = int(best[2][:4])
-    except Exception:
-        best_trough_year = 0
-
-    for ev in drawdown_events[1:]:
-        try:
-            ev_trough_year = int(ev[2][:4])
-        except Exception:
-            continue
-        if abs(ev_trough_year - best_trough_year) >= 2:
-            result["secondDrawdown"] = round(ev[0] * 100, 2)
-            result["secondDrawdownPeriod"] = f"{_fmt_dd_date(ev[1])}–{_fmt_dd_date(ev[2])}"
-            result["secondDrawdownLabel"] = _label_drawdown(ev[2])
-            break
+    far = np.flatnonzero(np.abs(trough_years - trough_years[b]) >= 2)
+    if len(far):
+        k = int(far[depths[far].argmin()])
+        peak, trough = str(dates[peak_idx[k]]), str(dates[trough_idx[k]])
+        result["secondDrawdown"] = round(float(depths[k]) * 100, 2)
+        result["secondDrawdownPeriod"] = f"{_fmt_dd_date(peak)}–{_fmt_dd_date(trough)}"
+        result["secondDrawdownLabel"] = _label_drawdown(trough)
 
     return result
 
 
-def calc_period_return(prices, target_years):
-    """prices: list of (date_str, close). Returns (return_pct, note) or (None, '')."""
-    if len(prices) < 10:
-        return None, ""
-    last_date_str, last_close = prices[-1]
-    first_date_str = prices[0][0]
-    last_date = datetime.strptime(last_date_str[:10], "%Y-%m-%d")
-    first_date = datetime.strptime(first_date_str[:10], "%Y-%m-%d")
-    available_years = (last_date - first_date).days / 365.25
-    if available_years < target_years - 0.5:
-        return None, ""
-    target_date_str = (last_date - timedelta(days=target_years * 365.25)).strftime("%Y-%m-%d")
-    # Find closest date >= target
-    idx = 0
-    for i, (d, _) in enumerate(prices):
-        if d >= target_date_str:
-            idx = i
-            break
-    start_close = prices[idx][1]
-    actual_start = datetime.strptime(prices[idx][0][:10], "%Y-%m-%d")
-    actual_years = (last_date - actual_start).days / 365.25
-    if actual_years < 1:
-        return None, ""
-    ret = round(annualized_return(start_close, last_close, actual_years), 2)
-    note = ""
-    if actual_years < target_years - 0.5:
-        note = f"Since inception (~{available_years:.1f}Y)"
-    return ret, note
-
-
-def calc_since_inception_return(prices):
-    """Compute annualized return using the full available price series.
-    Returns (return_pct, years_of_data) or (None, 0)."""
-    if len(prices) < 10:
-        return None, 0
-    first_date_str, first_close = prices[0]
-    last_date_str, last_close = prices[-1]
-    first_date = datetime.strptime(first_date_str[:10], "%Y-%m-%d")
-    last_date = datetime.strptime(last_date_str[:10], "%Y-%m-%d")
-    total_years = (last_date - first_date).days / 365.25
-    if total_years < 1 or first_close <= 0:
-        return None, 0
-    ret = round(annualized_return(first_close, last_close, total_years), 2)
-    return ret, round(total_years, 1)
-
-
-def calc_since_date_return(prices, since_date_str):
-    """Compute annualized return from a specific start date (e.g. '1990-01-01').
-    Returns (return_pct, years) or (None, 0) if data doesn't reach that date."""
-    if len(prices) < 10:
-        return None, 0
-    first_available = prices[0][0]
-    if first_available > since_date_str:
-        return None, 0  # data doesn't go back far enough
-    # Find closest date >= since_date_str
-    idx = 0
-    for i, (d, _) in enumerate(prices):
-        if d >= since_date_str:
-            idx = i
-            break
-    start_close = prices[idx][1]
-    if start_close <= 0:
-        return None, 0
-    last_date_str, last_close = prices[-1]
-    start_date = datetime.strptime(prices[idx][0][:10], "%Y-%m-%d")
-    end_date = datetime.strptime(last_date_str[:10], "%Y-%m-%d")
-    years = (end_date - start_date).days / 365.25
-    if years < 1:
-        return None, 0
-    ret = round(annualized_return(start_close, last_close, years), 2)
-    return ret, round(years, 1)
-
-
-def _compute_short_returns(prices, fallback, now):
-    """Compute YTD, 1Y, 3Y returns from a price list. Returns (ytd, one_yr, three_yr)."""
-    ytd_start = f"{now.year}-01-01"
-    if len(prices) < 10:
-        return (fallback.get("ytdReturn", 0),
-                fallback.get("oneYearReturn", 0),
-                fallback.get("threeYearReturn", 0))
-
-    last_close = prices[-1][1]
-
-    # YTD
-    ytd_prices = [(d, c) for d, c in prices if d >= ytd_start]
-    if len(ytd_prices) >= 2:
-        ytd_ret = round(((ytd_prices[-1][1] - ytd_prices[0][1]) / ytd_prices[0][1]) * 100, 2)
-    else:
-        ytd_ret = fallback.get("ytdReturn", 0)
-
-    # 1Y
-    one_yr_cutoff = (now - timedelta(days=365)).strftime("%Y-%m-%d")
-    one_yr_price = next((c for d, c in prices if d >= one_yr_cutoff), None)
-    one_yr = round(((last_close - one_yr_price) / one_yr_price) * 100, 2) if one_yr_price else fallback.get("oneYearReturn", 0)
-
-    # 3Y
-    three_yr_cutoff = (now - timedelta(days=3 * 365)).strftime("%Y-%m-%d")
-    three_yr_price = next((c for d, c in prices if d >= three_yr_cutoff), None)
-    three_yr = round(annualized_return(three_yr_price, last_close, 3), 2) if three_yr_price else fallback.get("threeYearReturn", 0)
-
-    return ytd_ret, one_yr, three_yr
+_ONE_DAY = np.timedelta64(1, "D")
+
+
+def _span_years(start, end):
+    """Years (of 365.25 days) between two datetime64[D] values."""
+    return float((end - start) / _ONE_DAY) / 365.25
+
+
+# Whole-day lookback to each fixed-horizon start: the first day on or after
+# last − N×365.25 days
+_PERIOD_LOOKBACK = np.array([math.ceil(y * 365.25) for _, y in _RETURN_PERIODS],
+                            dtype="timedelta64[D]")
+_SINCE_1990 = np.datetime64("1990-01-01", "D")
+
+
+def compute_all_returns(prices, now):
+    """Every return figure for one PriceSeries (at least 10 rows) in a single
+    pass: all start dates are located with one searchsorted and each figure
+    is then a couple of array reads. Returns a dict keyed like the dashboard
+    entry fields — <period>Return/<period>Note for 5Y–25Y, sinceInception
+    and since1990 Return/Years, ytd/oneYear/threeYear Return — plus the
+    calc_drawdowns dict under "drawdowns". A Return is None where the data
+    can't support it; callers substitute fallbacks."""
+    dates, closes = prices
+    n = len(closes)
+    first_date, last_date = dates[0], dates[-1]
+    first_close, last_close = float(closes[0]), float(closes[-1])
+    today = np.datetime64(now.date(), "D")
+    cutoffs = np.concatenate((
+        last_date - _PERIOD_LOOKBACK,
+        [_SINCE_1990,
+         np.datetime64(f"{now.year}-01-01", "D"),
+         today - np.timedelta64(365, "D"),
+         today - np.timedelta64(3 * 365, "D")],
+    ))
+    starts = dates.searchsorted(cutoffs).tolist()
+    *period_starts, since_1990_i, ytd_i, one_yr_i, three_yr_i = starts
+    out = {}
+
+    # N-year annualized returns; capped to what the data covers, with a note
+    available_years = _span_years(first_date, last_date)
+    for (key, years), i in zip(_RETURN_PERIODS, period_starts):
+        ret, note = None, ""
+        if available_years >= years - 0.5:
+            actual_years = _span_years(dates[i], last_date)
+            if actual_years >= 1:
+                ret = round(annualized_return(float(closes[i]), last_close, actual_years), 2)
+                if actual_years < years - 0.5:
+                    note = f"Since inception (~{available_years:.1f}Y)"
+        out[f"{key}Return"], out[f"{key}Note"] = ret, note
+
+    # Since inception: the full series
+    out["sinceInceptionReturn"], out["sinceInceptionYears"] = None, 0
+    if available_years >= 1 and first_close > 0:
+        out["sinceInceptionReturn"] = round(annualized_return(first_close, last_close, available_years), 2)
+        out["sinceInceptionYears"] = round(available_years, 1)
+
+    # Since 1990: only when the data reaches back that far
+    out["since1990Return"], out["since1990Years"] = None, 0
+    if first_date <= _SINCE_1990:
+        i = since_1990_i if since_1990_i < n else 0
+        start_close = float(closes[i])
+        years = _span_years(dates[i], last_date)
+        if start_close > 0 and years >= 1:
+            out["since1990Return"] = round(annualized_return(start_close, last_close, years), 2)
+            out["since1990Years"] = round(years, 1)
+
+    # YTD (needs two points this year), 1Y simple, 3Y annualized
+    out["ytdReturn"] = None
+    if n - ytd_i >= 2:
+        ytd_first = float(closes[ytd_i])
+        out["ytdReturn"] = round(((last_close - ytd_first) / ytd_first) * 100, 2)
+    one_yr_price = float(closes[one_yr_i]) if one_yr_i < n else None
+    out["oneYearReturn"] = round(((last_close - one_yr_price) / one_yr_price) * 100, 2) if one_yr_price else None
+    three_yr_price = float(closes[three_yr_i]) if three_yr_i < n else None
+    out["threeYearReturn"] = round(annualized_return(three_yr_price, last_close, 3), 2) if three_yr_price else None
+
+    out["drawdowns"] = calc_drawdowns(prices)
+    return out
 
 
 # ══════════════════════════════════════════════════════════════════════
@@ -604,94 +818,94 @@ _FALLBACK_CORR = [
     [ 0.15, 0.12, 0.15, 0.15, 0.18, 0.25, 0.25, 0.20, 0.05, 0.15, 0.30, 0.20, 1.00],  # CPH-RE
 ]
 
-# Build {ticker: {ticker: corr}} lookup from the matrix
-FALLBACK_CORR_MAP = {}
-for i, t1 in enumerate(_ALL_TICKERS_ORDER):
-    FALLBACK_CORR_MAP[t1] = {}
-    for j, t2 in enumerate(_ALL_TICKERS_ORDER):
-        FALLBACK_CORR_MAP[t1][t2] = _FALLBACK_CORR[i][j]
+# Correlation matrices (the fallback and compute_correlation_map's) are
+# indexed by TICKER_IDX on both axes.
+TICKER_IDX = {t: i for i, t in enumerate(_ALL_TICKERS_ORDER)}
+FALLBACK_CORR_MAT = np.asarray(_FALLBACK_CORR, dtype=np.float64)
+FALLBACK_CORR_MAT.flags.writeable = False
+
+
+def corr_submatrix(corr, tickers, default=0.5):
+    """Correlations among *tickers*, in that order, from the TICKER_IDX-indexed
+    matrix *corr*; *default* for any ticker it doesn't cover."""
+    k = len(corr)
+    padded = np.full((k + 1, k + 1), default)
+    padded[:k, :k] = corr
+    idx = [TICKER_IDX.get(t, k) for t in tickers]
+    return padded[np.ix_(idx, idx)]
 
 
 def compute_correlation_map():
-    """Compute pairwise Pearson correlations from DB weekly prices.
-    Falls back to hardcoded matrix if insufficient data."""
-    all_tickers = TICKERS + STATIC_TICKERS  # includes CPH-RE
-    price_series = {}
+    """Compute pairwise Pearson correlations from DB weekly prices as a
+    (shared, read-only) TICKER_IDX-indexed matrix. Pairs (or the whole matrix)
+    without enough data keep the hardcoded fallback values. Memoized per
+    write generation, like the series it reads (see db_generation)."""
+    return _correlation_map(db_generation())
+
+
+@lru_cache(maxsize=1)
+def _correlation_map(generation):
+    price_series = {}  # ticker -> (return dates, returns)
+
+    def _returns(dates, closes):
+        # Step returns keyed by the later date, skipping steps off a non-positive close
+        prev, cur = closes[:-1], closes[1:]
+        ok = prev > 0
+        return dates[1:][ok], (cur[ok] - prev[ok]) / prev[ok]
 
     # Load weekly returns for ETFs
-    for ticker in TICKERS:
-        prices = db_load_prices(ticker)
-        if len(prices) < 52:  # need at least ~1 year of weekly data
+    for ticker, (dates, closes) in db_load_all_prices(TICKERS).items():
+        if len(closes) < 52:  # need at least ~1 year of weekly data
             continue
-        # Build {date: return} from weekly prices
-        returns = {}
-        for k in range(1, len(prices)):
-            d, c = prices[k]
-            _, prev_c = prices[k - 1]
-            if prev_c > 0:
-                returns[d] = (c - prev_c) / prev_c
-        if returns:
-            price_series[ticker] = returns
+        d, r = _returns(dates, closes)
+        if len(r):
+            price_series[ticker] = (d, r)
 
     # Load quarterly returns for CPH-RE
-    housing = db_load_housing()
-    if len(housing) >= 8:
-        returns = {}
-        for k in range(1, len(housing)):
-            d, c = housing[k]
-            _, prev_c = housing[k - 1]
-            if prev_c > 0:
-                returns[d] = (c - prev_c) / prev_c
-        if returns:
-            price_series["CPH-RE"] = returns
+    housing = db_load_housing_series()
+    if len(housing.closes) >= 8:
+        d, r = _returns(*housing)
+        if len(r):
+            price_series["CPH-RE"] = (d, r)
 
     # Need at least 5 tickers with data to compute meaningful correlations
     if len(price_series) < 5:
-        return FALLBACK_CORR_MAP
+        return FALLBACK_CORR_MAT
 
-    # Compute pairwise Pearson correlation
-    corr_map = {}
+    # Align every series on the union of dates: X is T×N, NaN where a ticker
+    # has no return for that date.
     tickers_with_data = list(price_series.keys())
-
-    for t1 in tickers_with_data:
-        corr_map[t1] = {}
-        for t2 in tickers_with_data:
-            if t1 == t2:
-                corr_map[t1][t2] = 1.0
-                continue
-            # Find overlapping dates
-            common = set(price_series[t1].keys()) & set(price_series[t2].keys())
-            if len(common) < 26:  # need at least ~6 months overlap
-                # Use fallback for this pair
-                corr_map[t1][t2] = FALLBACK_CORR_MAP.get(t1, {}).get(t2, 0.5)
-                continue
-            dates = sorted(common)
-            r1 = [price_series[t1][d] for d in dates]
-            r2 = [price_series[t2][d] for d in dates]
-            # Pearson correlation
-            n = len(r1)
-            mean1 = sum(r1) / n
-            mean2 = sum(r2) / n
-            cov = sum((a - mean1) * (b - mean2) for a, b in zip(r1, r2))
-            std1 = math.sqrt(sum((a - mean1) ** 2 for a in r1))
-            std2 = math.sqrt(sum((b - mean2) ** 2 for b in r2))
-            if std1 > 0 and std2 > 0:
-                corr_map[t1][t2] = round(cov / (std1 * std2), 4)
-            else:
-                corr_map[t1][t2] = 0.0
-
-    # Fill in any tickers that had no data from fallback
-    for t in all_tickers:
-        if t not in corr_map:
-            corr_map[t] = {}
-        for t2 in all_tickers:
-            if t2 not in corr_map[t]:
-                corr_map[t][t2] = FALLBACK_CORR_MAP.get(t, {}).get(t2, 0.5)
-
-    return corr_map
-
-
-def diversification_sort(results, corr_map, top_n=4):
+    all_dates = np.unique(np.concatenate([d for d, _ in price_series.values()]))
+    X = np.full((len(all_dates), len(tickers_with_data)), np.nan)
+    for j, (d, r) in enumerate(price_series.values()):
+        X[all_dates.searchsorted(d), j] = r
+
+    # Pairwise-complete Pearson for all pairs at once. Each column is centred
+    # on its own mean first, so the one-pass sums below stay well conditioned;
+    # Pearson is shift-invariant, so this doesn't change the result.
+    present = ~np.isnan(X)
+    M = present.astype(np.float64)
+    Z = np.where(present, X - np.nanmean(X, axis=0), 0.0)
+    n = M.T @ M                     # overlap counts
+    S = Z.T @ M                     # S[i, j] = Σ x_i over dates shared with j
+    cov = Z.T @ Z - S * S.T / np.maximum(n, 1)
+    var = (Z * Z).T @ M - S * S / np.maximum(n, 1)
+    denom = np.sqrt(np.clip(var, 0, None) * np.clip(var.T, 0, None))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = np.where(denom > 0, cov / denom, 0.0)
+
+    corr_mat = FALLBACK_CORR_MAT.copy()
+    idx = [TICKER_IDX[t] for t in tickers_with_data]
+    for i, a in enumerate(idx):
+        corr_mat[a, a] = 1.0
+        for j, b in enumerate(idx):
+            if i != j and n[i, j] >= 26:  # need at least ~6 months overlap
+                corr_mat[a, b] = round(float(corr[i, j]), 4)
+    corr_mat.flags.writeable = False
+    return corr_mat
+
+
+def diversification_sort(results, corr_mat, top_n=4):
     """Sort results: top_n by 10Y return, then greedily pick least correlated.
 
     For positions 1–top_n: highest 10Y annualized return.
@@ -704,35 +918,45 @@ def diversification_sort(results, corr_map, top_n=4):
 
     # Step 1: top_n by 10Y return
     by_return = sorted(results, key=lambda e: e.get("tenYearReturn") or 0, reverse=True)
-    selected = list(by_return[:top_n])
-    remaining = list(by_return[top_n:])
-
-    # Step 2: greedily pick least correlated
-    while remaining:
-        best_candidate = None
-        best_avg_corr = float("inf")
-
-        for candidate in remaining:
-            ct = candidate["ticker"]
-            # Average absolute correlation with all selected assets
-            corrs = []
-            for sel in selected:
-                st = sel["ticker"]
-                c = corr_map.get(ct, {}).get(st, corr_map.get(st, {}).get(ct, 0.5))
-                corrs.append(abs(c))
-            avg_corr = sum(corrs) / len(corrs) if corrs else 1.0
-
-            if avg_corr < best_avg_corr:
-                best_avg_corr = avg_corr
-                best_candidate = candidate
-
-        if best_candidate:
-            selected.append(best_candidate)
-            remaining.remove(best_candidate)
+    # Step 2: greedily pick least correlated. abs_corr[i, j] is |ρ| between
+    # by_return[i] and by_return[j]; totals[i] is the running sum of |ρ| from
+    # asset i to everything selected so far, added in selection order.
+    abs_corr = np.abs(corr_submatrix(corr_mat, [e["ticker"] for e in by_return]))
+    selected_idx = list(range(top_n))
+    totals = np.zeros(len(by_return))
+    for j in selected_idx:
+        totals += abs_corr[:, j]
+    remaining_idx = np.arange(top_n, len(by_return))
+    while len(remaining_idx):
+        if selected_idx:
+            # argmin takes the first candidate on ties; remaining keeps its order
+            k = int((totals[remaining_idx] / len(selected_idx)).argmin())
+        else:
+            k = 0
+        pick = int(remaining_idx[k])
+        selected_idx.append(pick)
+        totals += abs_corr[:, pick]
+        remaining_idx = np.delete(remaining_idx, k)
+    selected = [by_return[i] for i in selected_idx]
 
     return selected
 
 
+def assign_ranks(results, corr_mat, top_n=4):
+    """Number diversification-sorted *results* in place and label why each is
+    there: the top_n by return, the rest by their average correlation to the
+    assets ranked above them."""
+    corr = corr_submatrix(corr_mat, [e["ticker"] for e in results]).tolist()
+    for i, etf in enumerate(results):
+        etf["rank"] = i + 1
+        if i < top_n:
+            etf["rankReason"] = "Top 10Y return"
+        else:
+            corrs = corr[i][:i]
+            avg_c = sum(corrs) / len(corrs) if corrs else 0
+            etf["rankReason"] = f"Diversifier (avg corr {avg_c:+.2f})"
+
+
 def _avg(values):
     """Average of non-None values, or None if empty."""
     vals = [v for v in values if v is not None]
@@ -745,7 +969,7 @@ def _avg_dd(values):
     return round(sum(vals) / len(vals), 2) if vals else 0
 
 
-def build_portfolio_entry(assets, n=7, corr_map=None):
+def build_portfolio_entry(assets, n=7, corr_mat=None):
     """Build a synthetic equally-weighted portfolio from the first *n* assets.
     Computes averaged returns and cumulative growth.  Returns a dict."""
     pool = assets[:n]
@@ -816,24 +1040,14 @@ def build_portfolio_entry(assets, n=7, corr_map=None):
     }
 
     # Cumulative returns
-    entry["fiveYearCumulativeReturn"] = cumulative_return(five_yr, 5)
-    entry["tenYearCumulativeReturn"] = cumulative_return(ten_yr, 10)
-    entry["fifteenYearCumulativeReturn"] = cumulative_return(fifteen_yr, 15)
-    entry["twentyYearCumulativeReturn"] = cumulative_return(twenty_yr, 20)
-    entry["twentyFiveYearCumulativeReturn"] = cumulative_return(twentyfive_yr, 25)
-    entry["since1990CumulativeReturn"] = cumulative_return(since_1990, since_1990_yrs) if since_1990 else None
-    entry["fortyYearCumulativeReturn"] = cumulative_return(best_annualized_return(entry), 40)
+    _set_cumulative_returns(entry)
 
-    # Portfolio volatility estimate: σ_p = sqrt( (1/n²) * Σ Σ ρ_ij * σ_i * σ_j )
+    # Portfolio volatility estimate: σ_p = sqrt( (1/n²) * σᵀ R σ )
     stds = [a.get("annualizedStdDev") for a in pool]
-    if all(s is not None for s in stds) and corr_map:
-        var_sum = 0.0
-        for i_idx, a in enumerate(pool):
-            for j_idx, b in enumerate(pool):
-                si = stds[i_idx] / 100
-                sj = stds[j_idx] / 100
-                rho = corr_map.get(a["ticker"], {}).get(b["ticker"], 0.5)
-                var_sum += si * sj * rho
+    if all(s is not None for s in stds) and corr_mat is not None:
+        sigma = np.array(stds, dtype=np.float64) / 100
+        R = corr_submatrix(corr_mat, [a["ticker"] for a in pool])
+        var_sum = float(sigma @ R @ sigma)
         port_std = round(math.sqrt(var_sum / (n * n)) * 100, 2)
     else:
         # Simple fallback: avg std / sqrt(n)
@@ -850,181 +1064,174 @@ def build_portfolio_entry(assets, n=7, corr_map=None):
 #  Compute dashboard from DB (no network needed)
 # ══════════════════════════════════════════════════════════════════════
 
-def compute_from_db():
-    """Load all data from SQLite and compute the full dashboard."""
-    now = datetime.now()
-    results = []
-
-    for ticker in TICKERS:
-        meta = ETF_META.get(ticker, {})
-        fallback = next((e for e in FALLBACK_DATA if e["ticker"] == ticker), {})
-
-        # Load from DB
-        prices = db_load_prices(ticker)
-        info, _info_updated = db_load_info(ticker)
-        if info is None:
-            info = {}
-
-        # ── Extract fields from info (with fallback) ─────────────
-        price_val = info.get("regularMarketPrice") or info.get("previousClose")
-        if not price_val and prices:
-            price_val = prices[-1][1]
-        price_val = price_val or fallback.get("price", 0)
-
-        mkt_raw = info.get("totalAssets") or info.get("marketCap") or 0
-        market_cap = round(mkt_raw / 1e9, 1) if mkt_raw else fallback.get("marketCap", 0)
-        avg_volume = info.get("averageDailyVolume10Day") or info.get("averageVolume") or fallback.get("avgVolume", 0)
-
-        expense_ratio = None
-        for key in ["annualReportExpenseRatio", "expenseRatio"]:
-            val = info.get(key)
-            if val is not None:
-                expense_ratio = round(val * 100, 4) if val < 1 else round(val, 4)
-                break
-        if expense_ratio is None:
-            expense_ratio = fallback.get("expenseRatio")
+# Kept for the process lifetime so each worker's thread-local connection
+# (_db) is opened once rather than on every rebuild.
+_COMPUTE_POOL = ThreadPoolExecutor(max_workers=min(8, len(TICKERS)), thread_name_prefix="compute")
 
-        div_yield = info.get("yield")
-        if div_yield is not None:
-            div_yield = round(div_yield * 100, 2)
-        else:
-            dy = info.get("trailingAnnualDividendYield")
-            div_yield = round(dy * 100, 2) if dy else fallback.get("dividendYield", 0)
 
-        holdings = info.get("totalHoldings") or fallback.get("holdings")
-        inception = info.get("fundInceptionDate")
-        if inception:
-            try:
-                inception = datetime.utcfromtimestamp(inception).strftime("%Y-%m-%d")
-            except Exception:
-                inception = fallback.get("inceptionDate")
-        else:
-            inception = fallback.get("inceptionDate")
+def _build_ticker_entry(ticker, now):
+    """Compute one ETF's dashboard entry from its stored prices and info."""
+    meta = ETF_META.get(ticker, {})
+    fallback = FALLBACK_BY_TICKER.get(ticker, {})
 
-        issuer = info.get("fundFamily") or fallback.get("issuer", "")
-        name = info.get("shortName") or info.get("longName") or fallback.get("name", ticker)
-
-        # ── Compute returns from stored prices ───────────────────
-        if len(prices) > 10:
-            five_yr, five_yr_note = calc_period_return(prices, 5)
-            ten_yr, ten_yr_note = calc_period_return(prices, 10)
-            fifteen_yr, fifteen_yr_note = calc_period_return(prices, 15)
-            twenty_yr, twenty_yr_note = calc_period_return(prices, 20)
-            twentyfive_yr, twentyfive_yr_note = calc_period_return(prices, 25)
-            since_inc_ret, since_inc_years = calc_since_inception_return(prices)
-            since_1990_ret, since_1990_years = calc_since_date_return(prices, "1990-01-01")
-            dd_info = calc_drawdowns(prices)
-            ytd_ret, one_yr, three_yr = _compute_short_returns(prices, fallback, now)
-        else:
-            five_yr = fallback.get("fiveYearReturn")
-            five_yr_note = fallback.get("fiveYearNote", "")
-            ten_yr = fallback.get("tenYearReturn")
-            ten_yr_note = fallback.get("tenYearNote", "")
-            fifteen_yr = fallback.get("fifteenYearReturn", 0)
-            fifteen_yr_note = fallback.get("fifteenYearNote", "")
-            twenty_yr = fallback.get("twentyYearReturn")
-            twenty_yr_note = fallback.get("twentyYearNote", "")
-            twentyfive_yr = fallback.get("twentyFiveYearReturn")
-            twentyfive_yr_note = fallback.get("twentyFiveYearNote", "")
-            dd_info = {
-                "maxDrawdown": fallback.get("maxDrawdown", 0),
-                "drawdownPeriod": fallback.get("drawdownPeriod", "N/A"),
-                "drawdownLabel": fallback.get("drawdownLabel", ""),
-                "secondDrawdown": fallback.get("secondDrawdown"),
-                "secondDrawdownPeriod": fallback.get("secondDrawdownPeriod"),
-                "secondDrawdownLabel": fallback.get("secondDrawdownLabel", ""),
-            }
-            ytd_ret = fallback.get("ytdReturn", 0)
-            one_yr = fallback.get("oneYearReturn", 0)
-            three_yr = fallback.get("threeYearReturn", 0)
-            since_inc_ret = fallback.get("sinceInceptionReturn")
-            since_inc_years = fallback.get("sinceInceptionYears", 0)
-            since_1990_ret = fallback.get("since1990Return")
-            since_1990_years = fallback.get("since1990Years", 0)
-
-        # Fall back for any None long-term returns
-        if five_yr is None:
-            five_yr = fallback.get("fiveYearReturn")
-            five_yr_note = fallback.get("fiveYearNote", "")
-        if ten_yr is None:
-            ten_yr = fallback.get("tenYearReturn")
-            ten_yr_note = fallback.get("tenYearNote", "")
-        if fifteen_yr is None:
-            fifteen_yr = fallback.get("fifteenYearReturn", 0)
-            fifteen_yr_note = fallback.get("fifteenYearNote", "")
-        if twenty_yr is None:
-            twenty_yr = fallback.get("twentyYearReturn")
-            twenty_yr_note = fallback.get("twentyYearNote", "")
-        if twentyfive_yr is None:
-            twentyfive_yr = fallback.get("twentyFiveYearReturn")
-            twentyfive_yr_note = fallback.get("twentyFiveYearNote", "")
-
-        # Determine earliest data date + note if extended by index backer
-        data_start = prices[0][0] if prices else fallback.get("dataStart")
-        backer_note = ""
-        if ticker in INDEX_BACKERS and INDEX_BACKERS[ticker] and data_start and inception:
-            try:
-                ds = datetime.strptime(str(data_start)[:10], "%Y-%m-%d")
-                inc = datetime.strptime(str(inception)[:10], "%Y-%m-%d")
-                if ds < inc - timedelta(days=180):
-                    descs = [b[1] for b in INDEX_BACKERS[ticker]]
-                    backer_note = "Extended via " + " → ".join(descs)
-            except Exception:
-                pass
-
-        entry = {
-            "ticker": ticker, "name": name, "issuer": issuer,
-            "marketCap": market_cap, "price": round(price_val, 2) if price_val else 0,
-            "expenseRatio": expense_ratio,
-            "ytdReturn": ytd_ret, "oneYearReturn": one_yr,
-            "threeYearReturn": three_yr,
-            "fiveYearReturn": five_yr, "fiveYearNote": five_yr_note or "",
-            "tenYearReturn": ten_yr, "tenYearNote": ten_yr_note or "",
-            "fifteenYearReturn": fifteen_yr, "fifteenYearNote": fifteen_yr_note or "",
-            "twentyYearReturn": twenty_yr, "twentyYearNote": twenty_yr_note or "",
-            "twentyFiveYearReturn": twentyfive_yr, "twentyFiveYearNote": twentyfive_yr_note or "",
-            "sinceInceptionReturn": since_inc_ret, "sinceInceptionYears": since_inc_years,
-            "since1990Return": since_1990_ret, "since1990Years": since_1990_years,
-            **dd_info,
-            "dataStart": data_start,
-            "dividendYield": div_yield, "avgVolume": avg_volume,
-            "holdings": holdings, "inceptionDate": inception,
-            "category": meta.get("category", ""), "index": meta.get("index", ""),
-            "description": meta.get("description", ""),
-            "backerNote": backer_note,
+    # Load from DB
+    prices = db_load_series(ticker)
+    n_prices = len(prices.closes)
+    info, _info_updated = db_load_info(ticker)
+    if info is None:
+        info = {}
+
+    # ── Extract fields from info (with fallback) ─────────────
+    price_val = info.get("regularMarketPrice") or info.get("previousClose")
+    if not price_val and n_prices:
+        price_val = float(prices.closes[-1])
+    price_val = price_val or fallback.get("price", 0)
+
+    mkt_raw = info.get("totalAssets") or info.get("marketCap") or 0
+    market_cap = round(mkt_raw / 1e9, 1) if mkt_raw else fallback.get("marketCap", 0)
+    avg_volume = info.get("averageDailyVolume10Day") or info.get("averageVolume") or fallback.get("avgVolume", 0)
+
+    expense_ratio = None
+    for key in ["annualReportExpenseRatio", "expenseRatio"]:
+        val = info.get(key)
+        if val is not None:
+            expense_ratio = round(val * 100, 4) if val < 1 else round(val, 4)
+            break
+    if expense_ratio is None:
+        expense_ratio = fallback.get("expenseRatio")
+
+    div_yield = info.get("yield")
+    if div_yield is not None:
+        div_yield = round(div_yield * 100, 2)
+    else:
+        dy = info.get("trailingAnnualDividendYield")
+        div_yield = round(dy * 100, 2) if dy else fallback.get("dividendYield", 0)
+
+    holdings = info.get("totalHoldings") or fallback.get("holdings")
+    inception = info.get("fundInceptionDate")
+    if inception:
+        try:
+            inception = datetime.utcfromtimestamp(inception).strftime("%Y-%m-%d")
+        except Exception:
+            inception = fallback.get("inceptionDate")
+    else:
+        inception = fallback.get("inceptionDate")
+
+    issuer = info.get("fundFamily") or fallback.get("issuer", "")
+    name = info.get("shortName") or info.get("longName") or fallback.get("name", ticker)
+
+    # ── Compute returns from stored prices ───────────────────
+    have_prices = n_prices > 10
+    computed = compute_all_returns(prices, now) if have_prices else {}
+
+    def _period(key, default=None):
+        # Computed N-year return + note, or the fallback's when there's none
+        ret = computed.get(f"{key}Return")
+        if ret is None:
+            return fallback.get(f"{key}Return", default), fallback.get(f"{key}Note", "")
+        return ret, computed[f"{key}Note"]
+
+    def _short(key):
+        ret = computed[key]
+        return ret if ret is not None else fallback.get(key, 0)
+
+    five_yr, five_yr_note = _period("fiveYear")
+    ten_yr, ten_yr_note = _period("tenYear")
+    fifteen_yr, fifteen_yr_note = _period("fifteenYear", 0)
+    twenty_yr, twenty_yr_note = _period("twentyYear")
+    twentyfive_yr, twentyfive_yr_note = _period("twentyFiveYear")
+    if have_prices:
+        since_inc_ret, since_inc_years = computed["sinceInceptionReturn"], computed["sinceInceptionYears"]
+        since_1990_ret, since_1990_years = computed["since1990Return"], computed["since1990Years"]
+        dd_info = computed["drawdowns"]
+        ytd_ret, one_yr, three_yr = _short("ytdReturn"), _short("oneYearReturn"), _short("threeYearReturn")
+    else:
+        dd_info = {
+            "maxDrawdown": fallback.get("maxDrawdown", 0),
+            "drawdownPeriod": fallback.get("drawdownPeriod", "N/A"),
+            "drawdownLabel": fallback.get("drawdownLabel", ""),
+            "secondDrawdown": fallback.get("secondDrawdown"),
+            "secondDrawdownPeriod": fallback.get("secondDrawdownPeriod"),
+            "secondDrawdownLabel": fallback.get("secondDrawdownLabel", ""),
         }
-        # Cumulative returns for each period
-        entry["fiveYearCumulativeReturn"] = cumulative_return(five_yr, 5)
-        entry["tenYearCumulativeReturn"] = cumulative_return(ten_yr, 10)
-        entry["fifteenYearCumulativeReturn"] = cumulative_return(fifteen_yr, 15)
-        entry["twentyYearCumulativeReturn"] = cumulative_return(twenty_yr, 20)
-        entry["twentyFiveYearCumulativeReturn"] = cumulative_return(twentyfive_yr, 25)
-        entry["since1990CumulativeReturn"] = cumulative_return(since_1990_ret, since_1990_years) if since_1990_ret else None
-        entry["fortyYearCumulativeReturn"] = cumulative_return(best_annualized_return(entry), 40)
-        # Volatility & Sharpe
-        std = calc_annualized_stddev(prices) if len(prices) > 52 else FALLBACK_STDDEV.get(ticker)
-        if std is None:
-            std = FALLBACK_STDDEV.get(ticker)
-        entry["annualizedStdDev"] = std
-        entry["sharpeRatio"] = calc_sharpe(ten_yr, std)
-        results.append(entry)
+        ytd_ret = fallback.get("ytdReturn", 0)
+        one_yr = fallback.get("oneYearReturn", 0)
+        three_yr = fallback.get("threeYearReturn", 0)
+        since_inc_ret = fallback.get("sinceInceptionReturn")
+        since_inc_years = fallback.get("sinceInceptionYears", 0)
+        since_1990_ret = fallback.get("since1990Return")
+        since_1990_years = fallback.get("since1990Years", 0)
+
+    # Determine earliest data date + note if extended by index backer
+    data_start = str(prices.dates[0]) if n_prices else fallback.get("dataStart")
+    backer_note = ""
+    if ticker in INDEX_BACKERS and INDEX_BACKERS[ticker] and data_start and inception:
+        try:
+            ds = _parse_iso(str(data_start))
+            inc = _parse_iso(str(inception))
+            if ds < inc - timedelta(days=180):
+                descs = [b[1] for b in INDEX_BACKERS[ticker]]
+                backer_note = "Extended via " + " → ".join(descs)
+        except Exception:
+            pass
+
+    entry = {
+        "ticker": ticker, "name": name, "issuer": issuer,
+        "marketCap": market_cap, "price": round(price_val, 2) if price_val else 0,
+        "expenseRatio": expense_ratio,
+        "ytdReturn": ytd_ret, "oneYearReturn": one_yr,
+        "threeYearReturn": three_yr,
+        "fiveYearReturn": five_yr, "fiveYearNote": five_yr_note or "",
+        "tenYearReturn": ten_yr, "tenYearNote": ten_yr_note or "",
+        "fifteenYearReturn": fifteen_yr, "fifteenYearNote": fifteen_yr_note or "",
+        "twentyYearReturn": twenty_yr, "twentyYearNote": twenty_yr_note or "",
+        "twentyFiveYearReturn": twentyfive_yr, "twentyFiveYearNote": twentyfive_yr_note or "",
+        "sinceInceptionReturn": since_inc_ret, "sinceInceptionYears": since_inc_years,
+        "since1990Return": since_1990_ret, "since1990Years": since_1990_years,
+        **dd_info,
+        "dataStart": data_start,
+        "dividendYield": div_yield, "avgVolume": avg_volume,
+        "holdings": holdings, "inceptionDate": inception,
+        "category": meta.get("category", ""), "index": meta.get("index", ""),
+        "description": meta.get("description", ""),
+        "backerNote": backer_note,
+    }
+    # Cumulative returns for each period
+    _set_cumulative_returns(entry)
+    # Volatility & Sharpe
+    std = calc_annualized_stddev(prices) if n_prices > 52 else FALLBACK_STDDEV.get(ticker)
+    if std is None:
+        std = FALLBACK_STDDEV.get(ticker)
+    entry["annualizedStdDev"] = std
+    entry["sharpeRatio"] = calc_sharpe(ten_yr, std)
+    return entry
+
+
+def compute_from_db():
+    """Load all data from SQLite and compute the full dashboard."""
+    now = datetime.now()
+    # Tickers are independent; fan them out over the long-lived compute pool
+    results = list(_COMPUTE_POOL.map(lambda t: _build_ticker_entry(t, now), TICKERS))
 
     # ── Compute CPH-RE from housing DB ───────────────────────────
-    housing = db_load_housing()
-    cph_fallback = next((e for e in FALLBACK_DATA if e["ticker"] == "CPH-RE"), {})
+    housing = db_load_housing_series()
+    cph_fallback = FALLBACK_BY_TICKER.get("CPH-RE", {})
     cph_meta = ETF_META.get("CPH-RE", {})
 
-    if len(housing) > 10:
+    if len(housing.closes) > 10:
         # Price-only returns from DST data
-        five_yr_price, _ = calc_period_return(housing, 5)
-        ten_yr_price, _ = calc_period_return(housing, 10)
-        fifteen_yr_price, _ = calc_period_return(housing, 15)
-        twenty_yr_price, _ = calc_period_return(housing, 20)
-        twentyfive_yr_price, _ = calc_period_return(housing, 25)
-        cph_since_price, cph_since_years = calc_since_inception_return(housing)
-        cph_1990_price, cph_1990_years = calc_since_date_return(housing, "1990-01-01")
-        dd_info = calc_drawdowns(housing)
-        ytd_price, one_yr_price, three_yr_price = _compute_short_returns(housing, cph_fallback, now)
+        computed = compute_all_returns(housing, now)
+        five_yr_price = computed["fiveYearReturn"]
+        ten_yr_price = computed["tenYearReturn"]
+        fifteen_yr_price = computed["fifteenYearReturn"]
+        twenty_yr_price = computed["twentyYearReturn"]
+        twentyfive_yr_price = computed["twentyFiveYearReturn"]
+        cph_since_price, cph_since_years = computed["sinceInceptionReturn"], computed["sinceInceptionYears"]
+        cph_1990_price, cph_1990_years = computed["since1990Return"], computed["since1990Years"]
+        dd_info = computed["drawdowns"]
+        ytd_price, one_yr_price, three_yr_price = (
+            computed[k] if computed[k] is not None else cph_fallback.get(k, 0)
+            for k in ("ytdReturn", "oneYearReturn", "threeYearReturn"))
 
         # Total return ≈ price appreciation + rent yield (simple addition of annualized rates)
         _ry = CPH_RENT_YIELD
@@ -1045,7 +1252,7 @@ def compute_from_db():
         def _note(price_ret):
             return f"incl. ~{_ry}% rent (price only: {price_ret:.1f}%)" if price_ret is not None else ""
 
-        cph_data_start = housing[0][0] if housing else "1992-01-01"
+        cph_data_start = str(housing.dates[0])
         cph_entry = {
             "ticker": "CPH-RE", "name": "Copenhagen Apartments (price/m² + rent)",
             "issuer": "Statistics Denmark",
@@ -1077,60 +1284,26 @@ def compute_from_db():
                 f"Finance Denmark. Rent yield is an approximation."
             ),
         }
-        cph_entry["fiveYearCumulativeReturn"] = cumulative_return(five_yr, 5)
-        cph_entry["tenYearCumulativeReturn"] = cumulative_return(ten_yr, 10)
-        cph_entry["fifteenYearCumulativeReturn"] = cumulative_return(fifteen_yr, 15)
-        cph_entry["twentyYearCumulativeReturn"] = cumulative_return(twenty_yr, 20)
-        cph_entry["twentyFiveYearCumulativeReturn"] = cumulative_return(twentyfive_yr, 25)
-        cph_entry["since1990CumulativeReturn"] = cumulative_return(cph_1990_ret, cph_1990_years) if cph_1990_ret else None
-        cph_entry["fortyYearCumulativeReturn"] = cumulative_return(best_annualized_return(cph_entry), 40)
+        _set_cumulative_returns(cph_entry)
         # CPH-RE volatility: quarterly data → annualize with √4
-        cph_std = FALLBACK_STDDEV.get("CPH-RE")
-        if len(housing) >= 8:
-            rets = []
-            for k in range(1, len(housing)):
-                _, c = housing[k]
-                _, pc = housing[k - 1]
-                if pc > 0:
-                    rets.append((c - pc) / pc)
-            if len(rets) >= 4:
-                m = sum(rets) / len(rets)
-                v = sum((r - m) ** 2 for r in rets) / (len(rets) - 1)
-                cph_std = round(math.sqrt(v) * math.sqrt(4) * 100, 2)
+        cph_std = calc_annualized_stddev(housing, periods_per_year=4, min_points=8, min_returns=4)
+        if cph_std is None:
+            cph_std = FALLBACK_STDDEV.get("CPH-RE")
         cph_entry["annualizedStdDev"] = cph_std
         cph_entry["sharpeRatio"] = calc_sharpe(ten_yr, cph_std)
         results.append(cph_entry)
     else:
         cph_fb = dict(cph_fallback)
-        cph_fb["fiveYearCumulativeReturn"] = cumulative_return(cph_fb.get("fiveYearReturn"), 5)
-        cph_fb["tenYearCumulativeReturn"] = cumulative_return(cph_fb.get("tenYearReturn"), 10)
-        cph_fb["fifteenYearCumulativeReturn"] = cumulative_return(cph_fb.get("fifteenYearReturn"), 15)
-        cph_fb["twentyYearCumulativeReturn"] = cumulative_return(cph_fb.get("twentyYearReturn"), 20)
-        cph_fb["twentyFiveYearCumulativeReturn"] = cumulative_return(cph_fb.get("twentyFiveYearReturn"), 25)
-        cph_fb["fortyYearCumulativeReturn"] = cumulative_return(best_annualized_return(cph_fb), 40)
+        _set_cumulative_returns(cph_fb, since_1990=False)
         results.append(cph_fb)
 
     # Sort: top 4 by 10Y return, then by lowest correlation (diversification)
-    corr_map = compute_correlation_map()
-    results = diversification_sort(results, corr_map, top_n=4)
-    for i, etf in enumerate(results):
-        etf["rank"] = i + 1
-        # Add ranking reason label
-        if i < 4:
-            etf["rankReason"] = "Top 10Y return"
-        else:
-            # Find avg correlation to assets above
-            ct = etf["ticker"]
-            corrs = []
-            for prev in results[:i]:
-                pt = prev["ticker"]
-                c = corr_map.get(ct, {}).get(pt, corr_map.get(pt, {}).get(ct, 0.5))
-                corrs.append(c)
-            avg_c = sum(corrs) / len(corrs) if corrs else 0
-            etf["rankReason"] = f"Diversifier (avg corr {avg_c:+.2f})"
+    corr_mat = compute_correlation_map()
+    results = diversification_sort(results, corr_mat, top_n=4)
+    assign_ranks(results, corr_mat, top_n=4)
 
     # Build equal-weight portfolio of top 7 and insert as first entry
-    portfolio = build_portfolio_entry(results, n=7, corr_map=corr_map)
+    portfolio = build_portfolio_entry(results, n=7, corr_mat=corr_mat)
     results.insert(0, portfolio)
 
     return results
@@ -1140,6 +1313,84 @@ def compute_from_db():
 #  Data Fetchers — Yahoo Finance (primary)
 # ══════════════════════════════════════════════════════════════════════
 
+def _make_session(pool_connections=10, pool_maxsize=50):
+    """Pooled keep-alive session. Transient 429/5xx responses are retried with
+    backoff here (POST included: the DST data queries are idempotent)."""
+    session = http_requests.Session()
+    session.headers["User-Agent"] = "Mozilla/5.0 (ETFCompare/1.0)"
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST"})
+    session.mount("https://", HTTPAdapter(pool_connections=pool_connections,
+                                          pool_maxsize=pool_maxsize, max_retries=retry))
+    return session
+
+
+_YAHOO_SESSION = _make_session()            # chart API, shared by the fetch workers
+_HTTP = _make_session(pool_connections=4, pool_maxsize=16)  # Statistics Denmark + Alpha Vantage
+HTTP_TIMEOUT = (5, 15)  # (connect, read) seconds
+
+
+SPARK_BATCH = 20   # symbols per spark request (Yahoo's limit)
+# Smallest spark range covering a lookback, as (max days, range).
+_SPARK_RANGES = ((5, "5d"), (28, "1mo"), (90, "3mo"), (180, "6mo"), (365, "1y"),
+                 (730, "2y"), (1825, "5y"), (3650, "10y"))
+
+
+def _chart_points(result):
+    """(date_str, close) pairs from one chart/spark result object, skipping
+    missing and non-positive closes."""
+    ts = result.get("timestamp") or []
+    closes = result["indicators"]["quote"][0].get("close") or []
+    # UTC calendar day of every timestamp in one numpy cast, not a
+    # utcfromtimestamp + strftime per point
+    days = np.asarray(ts, dtype=np.int64).astype("datetime64[s]").astype("datetime64[D]")
+    return [(d, round(float(c), 4)) for d, c in zip(days.astype(str).tolist(), closes)
+            if c is not None and c > 0]
+
+
+def _spark_range(since_date):
+    """Spark takes a range rather than period1, so pick the smallest one that
+    reaches back to *since_date* (the caller drops rows it already has)."""
+    if not since_date:
+        return "max"
+    try:
+        days = (datetime.now() - _parse_iso(since_date)).days + 1
+    except Exception:
+        return "max"
+    for limit, rng in _SPARK_RANGES:
+        if days <= limit:
+            return rng
+    return "max"
+
+
+def _yahoo_spark_batch(tickers, interval="1wk", since_date=None):
+    """Fetch history for many tickers via Yahoo's multi-symbol spark endpoint,
+    SPARK_BATCH symbols per request. Returns {ticker: [(date_str, close), ...]}
+    for the symbols Yahoo answered; missing ones are left for the caller to
+    fetch one by one with _yahoo_chart_api."""
+    url = "https://query1.finance.yahoo.com/v8/finance/spark"
+    rng = _spark_range(since_date)
+    out = {}
+    for i in range(0, len(tickers), SPARK_BATCH):
+        batch = tickers[i:i + SPARK_BATCH]
+        params = {"symbols": ",".join(batch), "range": rng,
+                  "interval": interval, "indicators": "close"}
+        try:
+            resp = _YAHOO_SESSION.get(url, params=params, timeout=20)
+            results = (resp.json().get("spark") or {}).get("result") or []
+        except Exception as e:
+            print(f"  [Yahoo] spark batch ({len(batch)} symbols) error: {e}")
+            continue
+        for entry in results:
+            symbol, response = entry.get("symbol"), entry.get("response")
+            if symbol in batch and response:
+                try:
+                    out[symbol] = _chart_points(response[0])
+                except (KeyError, IndexError, TypeError):
+                    pass
+    return out
+
+
 def _yahoo_chart_api(ticker, interval="1wk", since_date=None):
     """Fetch history for *ticker* via Yahoo Finance v8 chart API.
     If since_date (str 'YYYY-MM-DD') is given, only fetches from that date onward.
@@ -1149,28 +1400,19 @@ def _yahoo_chart_api(ticker, interval="1wk", since_date=None):
     url = f"https://query1.finance.yahoo.com/v8/finance/chart/{encoded}"
     if since_date:
         try:
-            p1 = int(datetime.strptime(since_date, "%Y-%m-%d").timestamp())
+            p1 = int(_parse_iso(since_date).timestamp())
         except Exception:
             p1 = 0
     else:
         p1 = 0
     params = {"period1": str(p1), "period2": "9999999999", "interval": interval}
-    headers = {"User-Agent": "Mozilla/5.0 (ETFCompare/1.0)"}
     for attempt in range(3):
         try:
-            resp = http_requests.get(url, params=params, headers=headers, timeout=20)
+            resp = _YAHOO_SESSION.get(url, params=params, timeout=20)
             data = resp.json()
             result = (data.get("chart") or {}).get("result")
             if result:
-                ts = result[0].get("timestamp", [])
-                closes = result[0]["indicators"]["quote"][0].get("close", [])
-                points = []
-                for i, t in enumerate(ts):
-                    c = closes[i] if i < len(closes) else None
-                    if c is not None and c > 0:
-                        d = datetime.utcfromtimestamp(t).strftime("%Y-%m-%d")
-                        points.append((d, round(float(c), 4)))
-                return points
+                return _chart_points(result[0])
             else:
                 err_msg = (data.get("chart") or {}).get("error", {}).get("description", "no result")
                 if attempt == 2:
@@ -1182,27 +1424,109 @@ def _yahoo_chart_api(ticker, interval="1wk", since_date=None):
     return []
 
 
-def _is_data_current(ticker, max_age_days=3):
+def _is_data_current(ticker, max_age_days=3, last=None, now=None):
     """Check if a ticker's most recent price is within max_age_days of today.
-    Accounts for weekends/holidays — data from last Friday is 'current' on Monday."""
-    last = db_last_date(ticker)
+    Accounts for weekends/holidays — data from last Friday is 'current' on Monday.
+    Pass *last* when the caller already knows the ticker's last date, and
+    *now* to judge a whole batch against the same moment."""
+    if last is None:
+        last = db_last_date(ticker)
     if not last:
         return False
-    try:
-        last_dt = datetime.strptime(last[:10], "%Y-%m-%d")
-        age = (datetime.now() - last_dt).days
-        return age <= max_age_days
-    except Exception:
-        return False
+    # ISO dates order as strings: "at most max_age_days whole days old" is
+    # "on or after the date max_age_days ago"
+    return last[:10] >= ((now or datetime.now()) - timedelta(days=max_age_days)).strftime("%Y-%m-%d")
+
+
+def _history_plan(existing, last, max_age_days, now=None):
+    """What *ticker* needs given its stored row count and last date:
+    "current", "update" (daily rows since *last*) or "full" (weekly history)."""
+    if existing > 200 and last:
+        if _is_data_current(None, max_age_days=max_age_days, last=last, now=now):
+            return "current"
+        return "update"
+    return "full"
+
+
+def _fetch_history_rows(ticker, tag, plan, existing, last, points=None):
+    """Fetch whatever *ticker* is missing, as decided by _history_plan from its
+    stored row count and last date. *points* are rows already fetched by a
+    spark batch; without them the ticker falls back to its own chart request.
+    Returns (rows, status) where status is "current" (nothing fetched),
+    "updated" (incremental daily rows), "full" (full weekly history) or "failed"."""
+    # Already current — skip entirely (no network call)
+    if plan == "current":
+        print(f"  [Yahoo] {tag} {ticker}: ✓ {existing} rows, last={last} (current), skip.")
+        return [], "current"
+
+    # Has substantial data but needs a recent update — incremental fetch
+    if plan == "update":
+        print(f"  [Yahoo] {tag} {ticker}: {existing} rows, last={last} (stale), fetching update...")
+        recent = points if points is not None else _yahoo_chart_api(ticker, "1d", since_date=last)
+        new_rows = [(ticker, d, c) for d, c in recent if d > last]
+        if new_rows:
+            print(f"    → {ticker}: added {len(new_rows)} new rows (up to {new_rows[-1][1]}).")
+        else:
+            print(f"    → {ticker}: already up to date.")
+        return new_rows, "updated"
+
+    # No data or very little — full weekly history fetch
+    print(f"  [Yahoo] {tag} {ticker}: "
+          f"{'empty' if existing == 0 else f'{existing} rows'}, fetching full weekly history...")
+    if not points:
+        points = _yahoo_chart_api(ticker, "1wk")
+    if not points:
+        print(f"  [Yahoo] {tag} {ticker}: no data returned.")
+        return None, "failed"
+    print(f"  [Yahoo] {tag} {ticker}: saved {len(points)} weekly rows "
+          f"({points[0][0]} → {points[-1][0]}).")
+    return [(ticker, d, c) for d, c in points], "full"
+
+
+def _fetch_histories(tickers, max_age_days):
+    """Run _fetch_history_rows for *tickers* on a thread pool.
+    Stale tickers are fetched up front in spark batches (current ones are never
+    requested); only symbols a batch didn't return cost a request of their own.
+    Returns (all_rows, statuses) with statuses keyed by ticker."""
+    all_rows, statuses = [], {}
+    n = len(tickers)
+    stored = db_price_stats()
+    stats = {t: stored.get(t, (0, None)) for t in tickers}
+    now = datetime.now()
+    plans = {t: _history_plan(*stats[t], max_age_days, now) for t in tickers}
+    updates = [t for t in tickers if plans[t] == "update"]
+    fulls = [t for t in tickers if plans[t] == "full"]
+    batched = {}
+    if updates:
+        batched.update(_yahoo_spark_batch(updates, "1d",
+                                          since_date=min(stats[t][1] for t in updates)))
+    if fulls:
+        batched.update(_yahoo_spark_batch(fulls, "1wk"))
+    with ThreadPoolExecutor(max_workers=YAHOO_WORKERS) as pool:
+        futures = {
+            pool.submit(_fetch_history_rows, t, f"[{i+1}/{n}]", plans[t],
+                        *stats[t], batched.get(t)): t
+            for i, t in enumerate(tickers)
+        }
+        for fut in as_completed(futures):
+            ticker = futures[fut]
+            try:
+                rows, statuses[ticker] = fut.result()
+            except Exception as e:
+                print(f"  [Yahoo] {ticker}: fetch failed: {e}")
+                statuses[ticker] = "failed"
+                continue
+            if rows:
+                all_rows.extend(rows)
+    return all_rows, statuses
 
 
 def fetch_yahoo_history():
     """Download weekly prices from Yahoo using direct chart API.
     Incremental: skips tickers whose data is already current (≤3 days old).
     For existing tickers, only fetches data from the last stored date onward.
+    Tickers are fetched concurrently; each step's rows are saved in one batch.
     Returns True if at least some data was fetched."""
-    success_count = 0
-    skipped_count = 0
     all_tickers = list(TICKERS)
 
     # Collect unique backer tickers we also need to fetch
@@ -1212,87 +1536,21 @@ def fetch_yahoo_history():
             backer_tickers_needed.add(backer_entry[0])
 
     # ── Step 1: Fetch all ETF tickers ──────────────────────────────────
-    for i, ticker in enumerate(all_tickers):
-        existing = db_price_count(ticker)
-        last = db_last_date(ticker)
-
-        # Already current — skip entirely (no network call)
-        if existing > 200 and _is_data_current(ticker, max_age_days=3):
-            print(f"  [Yahoo] [{i+1}/{len(all_tickers)}] {ticker}: ✓ {existing} rows, "
-                  f"last={last} (current), skip.")
-            skipped_count += 1
-            success_count += 1
-            continue
-
-        # Has substantial data but needs a recent update — incremental fetch
-        if existing > 200 and last:
-            print(f"  [Yahoo] [{i+1}/{len(all_tickers)}] {ticker}: {existing} rows, "
-                  f"last={last} (stale), fetching update...")
-            if i > 0:
-                time.sleep(1)
-            recent = _yahoo_chart_api(ticker, "1d", since_date=last)
-            new_rows = [(ticker, d, c) for d, c in recent if d > last]
-            if new_rows:
-                db_save_prices(new_rows)
-                print(f"    → Added {len(new_rows)} new rows (up to {new_rows[-1][1]}).")
-            else:
-                print(f"    → Already up to date.")
-            success_count += 1
-            continue
-
-        # No data or very little — full weekly history fetch
-        print(f"  [Yahoo] [{i+1}/{len(all_tickers)}] {ticker}: "
-              f"{'empty' if existing == 0 else f'{existing} rows'}, fetching full weekly history...")
-        if i > 0:
-            time.sleep(2)
-
-        points = _yahoo_chart_api(ticker, "1wk")
-        if points:
-            rows = [(ticker, d, c) for d, c in points]
-            db_save_prices(rows)
-            print(f"  [Yahoo] [{i+1}/{len(all_tickers)}] {ticker}: saved {len(rows)} weekly rows "
-                  f"({points[0][0]} → {points[-1][0]}).")
-            success_count += 1
-        else:
-            print(f"  [Yahoo] [{i+1}/{len(all_tickers)}] {ticker}: no data returned.")
+    rows, statuses = _fetch_histories(all_tickers, max_age_days=DATA_TTL["weekly_prices"] // 86400)
+    success_count = sum(1 for st in statuses.values() if st != "failed")
+    skipped_count = sum(1 for st in statuses.values() if st == "current")
+    # Saved before step 2: a backer can itself be an ETF (EFA backs VEA),
+    # and its row count must reflect what step 1 just fetched.
+    db_save_prices(rows)
 
     # ── Step 2: Fetch backer (index) tickers ───────────────────────────
+    # Backer data is historical index data that doesn't change
+    # retroactively, so it gets the longer index_backers TTL.
     if backer_tickers_needed:
         print(f"\n  [Yahoo] Fetching {len(backer_tickers_needed)} index backer ticker(s)...")
-    for j, bt in enumerate(sorted(backer_tickers_needed)):
-        existing = db_price_count(bt)
-        last = db_last_date(bt)
-
-        # Backer data is historical — if we have a good amount, skip entirely
-        # (backers are index data that doesn't change retroactively)
-        if existing > 200:
-            # Still do a quick incremental update for recent data points
-            if _is_data_current(bt, max_age_days=7):
-                print(f"  [Yahoo] [{j+1}] {bt}: ✓ {existing} rows (current), skip.")
-                continue
-            # Stale backer — incremental update
-            if last:
-                time.sleep(1)
-                print(f"  [Yahoo] [{j+1}] {bt}: {existing} rows, last={last}, updating...")
-                recent = _yahoo_chart_api(bt, "1d", since_date=last)
-                new_rows = [(bt, d, c) for d, c in recent if d > last]
-                if new_rows:
-                    db_save_prices(new_rows)
-                    print(f"    → Added {len(new_rows)} new rows.")
-                else:
-                    print(f"    → Already up to date.")
-                continue
-
-        # No data — full fetch
-        time.sleep(2)
-        print(f"  [Yahoo] [{j+1}] Fetching backer {bt}...")
-        points = _yahoo_chart_api(bt, "1wk")
-        if points:
-            rows = [(bt, d, c) for d, c in points]
-            db_save_prices(rows)
-            print(f"  [Yahoo] [{j+1}] {bt}: saved {len(rows)} rows ({points[0][0]} → {points[-1][0]}).")
-        else:
-            print(f"  [Yahoo] [{j+1}] {bt}: no data.")
+        rows, _ = _fetch_histories(sorted(backer_tickers_needed),
+                                   max_age_days=DATA_TTL["index_backers"] // 86400)
+        db_save_prices(rows)
 
     # ── Step 3: Splice backer data into ETF tickers ────────────────────
     _splice_backer_data()
@@ -1305,126 +1563,177 @@ def fetch_yahoo_history():
 def _splice_backer_data():
     """For each ETF with INDEX_BACKERS, chain-splice backer data before the ETF's earliest date.
     Backers are processed in listed order (first = closest to ETF inception, last = oldest).
-    Each layer is scaled so its last price matches the next layer's first price."""
-    for etf_ticker, backers in INDEX_BACKERS.items():
-        if not backers:
-            continue
-
-        # First, delete any previously spliced rows (backer dates before ETF's real inception)
-        # We detect the ETF's own earliest date from the original fetch
-        # by finding the earliest non-backer date. Since we INSERT OR REPLACE,
-        # we just re-splice from scratch using the original ETF data.
-        # Load current full series for this ETF (may include old spliced data)
-        all_prices = db_load_prices(etf_ticker)
-        if not all_prices:
-            continue
-
-        # The ETF's "real" start is the inception date from meta, or we approximate
-        # by finding where backer data would have ended
-        # Simpler: reload the original ETF data by checking what Yahoo returned
-        # for this ticker directly. Since backers are stored under their own ticker,
-        # we need to identify the ETF's native range.
-        # Approach: find the earliest backer date and remove ETF rows before that
-        # Actually, let's just delete all ETF rows that came from backers
-        # (i.e., before the ETF's real Yahoo data start) and re-splice.
-        # We know the ETF's real data starts at its Yahoo fetch start.
-        # Heuristic: the ETF's own data starts where the first backer ends.
-        # Better: just re-do. Delete rows before the latest backer's last date
-        # and rebuild.
-
-        # Get earliest date from the ETF ticker's own Yahoo data
-        # by loading the backer tickers and finding the boundary
-        backer_tickers_set = set()
-        for b in backers:
-            backer_tickers_set.add(b[0])
-
-        # Find the ETF's native start: the first date that ISN'T from a backer splice
-        # We stored backer data under the ETF ticker, so we can't distinguish.
-        # Solution: just re-do the splice. Delete all data before what we know
-        # is the ETF's own inception and re-insert from backers.
-        etf_inception = None
-        for e in FALLBACK_DATA:
-            if e.get("ticker") == etf_ticker:
-                etf_inception = e.get("inceptionDate") or e.get("dataStart")
-                break
-        if not etf_inception:
-            continue
-
-        # Delete previously spliced rows (those before inception)
-        conn = _db()
-        conn.execute("DELETE FROM weekly_prices WHERE ticker=? AND date < ?",
-                     (etf_ticker, etf_inception))
-        conn.commit()
-        conn.close()
-
-        # Reload the ETF's native data
-        etf_prices = db_load_prices(etf_ticker)
-        if not etf_prices:
-            continue
-
-        # Chain-splice backers in order: each fills the gap before current earliest
-        current_first_date = etf_prices[0][0]
-        current_first_price = etf_prices[0][1]
-        total_spliced = 0
-        splice_desc_parts = []
+    Each layer is scaled so its last price matches the next layer's first price.
+    The per-ETF DELETEs and all spliced rows land in one transaction, committed
+    together at the end of the loop, or rolled back together if it raises —
+    never left open on this thread's connection for another write to commit.
+    Every series involved is read once up front; the DELETEs are mirrored on
+    those in-memory copies, so later reads see exactly what the table holds."""
+    conn = _db()
+    needed = {t for t, bs in INDEX_BACKERS.items() if bs} | {
+        b[0] for bs in INDEX_BACKERS.values() for b in bs}
+    stored = {t: PriceSeries.from_rows(db_load_prices(t)) for t in sorted(needed)}
+    spliced_rows = []
+    with conn:
+        for etf_ticker, backers in INDEX_BACKERS.items():
+            if not backers:
+                continue
 
-        for backer_entry in backers:
-            backer_yt, backer_desc = backer_entry[0], backer_entry[1]
-            backer_prices = db_load_prices(backer_yt)
-            if not backer_prices:
+            all_prices = stored[etf_ticker]
+            if not len(all_prices.dates):
                 continue
 
-            # Only keep backer data BEFORE current earliest date
-            pre = [(d, c) for d, c in backer_prices if d < current_first_date and c > 0]
-            if not pre:
+            # Spliced rows are stored under the ETF's own ticker, so everything
+            # before its inception date is dropped and rebuilt from the backers.
+            fb = FALLBACK_BY_TICKER.get(etf_ticker, {})
+            etf_inception = fb.get("inceptionDate") or fb.get("dataStart")
+            if not etf_inception:
                 continue
 
-            # Scale: last backer price → current first price
-            backer_last_price = pre[-1][1]
-            if backer_last_price <= 0:
+            # Delete previously spliced rows (those before inception)
+            conn.execute("DELETE FROM weekly_prices WHERE ticker=? AND date < ?",
+                         (etf_ticker, etf_inception))
+
+            # What's left is the ETF's native data
+            k = all_prices.dates.searchsorted(np.datetime64(etf_inception, "D"))
+            etf_prices = stored[etf_ticker] = PriceSeries(all_prices.dates[k:], all_prices.closes[k:])
+            if not len(etf_prices.dates):
                 continue
-            scale = current_first_price / backer_last_price
 
-            rows = [(etf_ticker, d, round(c * scale, 4)) for d, c in pre]
-            db_save_prices(rows)
-            total_spliced += len(rows)
-            splice_desc_parts.append(f"{backer_desc} ({pre[0][0]}→{pre[-1][0]})")
+            # Chain-splice backers in order: each fills the gap before current earliest
+            current_first_date = etf_prices.dates[0]
+            current_first_price = float(etf_prices.closes[0])
+            total_spliced = 0
+            splice_desc_parts = []
+
+            for backer_entry in backers:
+                backer_yt, backer_desc = backer_entry[0], backer_entry[1]
+                backer_prices = stored[backer_yt]
+
+                # Only keep backer data BEFORE current earliest date (series are
+                # date-ordered, so that's a prefix)
+                k = backer_prices.dates.searchsorted(current_first_date)
+                keep = backer_prices.closes[:k] > 0
+                if not keep.any():
+                    continue
+                pre_dates, pre_closes = backer_prices.dates[:k][keep], backer_prices.closes[:k][keep]
+
+                # Scale: last backer price → current first price
+                scale = current_first_price / float(pre_closes[-1])
+
+                rows = [(etf_ticker, d, round(c, 4))
+                        for d, c in zip(pre_dates.astype(str).tolist(), (pre_closes * scale).tolist())]
+                spliced_rows.extend(rows)
+                total_spliced += len(rows)
+                splice_desc_parts.append(f"{backer_desc} ({pre_dates[0]}→{pre_dates[-1]})")
+
+                # Update anchor for next layer
+                current_first_date = pre_dates[0]
+                current_first_price = float(pre_closes[0]) * scale
+
+            if total_spliced > 0:
+                print(f"  [Splice] {etf_ticker}: +{total_spliced} rows via {' → '.join(splice_desc_parts)}")
+
+        conn.executemany(_PRICE_INSERT_SQL, spliced_rows)
+
+
+QUOTE_BATCH = 100  # symbols per v7 quote request
+# Fields the v7 quote endpoint shares with yfinance's .info — the ones that
+# move daily. Expense ratio, holdings, inception etc. only come from .info.
+_QUOTE_FIELDS = ("regularMarketPrice", "marketCap", "averageDailyVolume10Day",
+                 "trailingAnnualDividendYield", "shortName", "longName")
+# .info keys that _build_ticker_entry prefers over a quote field; dropped when
+# the quote supplies that field, or the refreshed value would never be shown.
+_QUOTE_SHADOWED = {"marketCap": "totalAssets", "trailingAnnualDividendYield": "yield"}
+# Quote refreshes don't touch AUM, holdings or the fund's own yield, so the
+# full .info is still fetched at least this often. Its time is kept in the
+# info dict, as updated_at moves on every quote refresh.
+FULL_INFO_TTL = 4 * DATA_TTL["ticker_info"]
+
+
+def _yahoo_quote_batch(tickers):
+    """Fetch current quotes for many tickers via Yahoo's v7 quote endpoint,
+    QUOTE_BATCH symbols per request. Returns {ticker: quote_dict} for the
+    symbols Yahoo answered (it may refuse the endpoint outright without a
+    session crumb, in which case this is simply empty)."""
+    url = "https://query2.finance.yahoo.com/v7/finance/quote"
+    out = {}
+    for i in range(0, len(tickers), QUOTE_BATCH):
+        batch = tickers[i:i + QUOTE_BATCH]
+        try:
+            resp = _YAHOO_SESSION.get(url, params={"symbols": ",".join(batch)}, timeout=20)
+            results = (resp.json().get("quoteResponse") or {}).get("result") or []
+        except Exception as e:
+            print(f"  [Yahoo] quote batch ({len(batch)} symbols) error: {e}")
+            continue
+        for q in results:
+            if q.get("symbol") in batch and q.get("regularMarketPrice"):
+                out[q["symbol"]] = q
+    return out
+
+
+def _info_is_fresh(ticker, info_ttl, now):
+    stored_info, updated_at = db_load_info(ticker)
+    return bool(stored_info) and now - updated_at < info_ttl
+
+
+def _fetch_info(i, ticker, info_ttl, quote=None, now=None):
+    """Refresh one ticker's stored info. With a batch *quote* and a full .info
+    stored within FULL_INFO_TTL, only the quote's daily fields are updated in
+    place; otherwise the full .info is fetched through yfinance."""
+    n = len(TICKERS)
+    now = now or time.time()
+    stored_info, updated_at = db_load_info(ticker)
+    age = now - updated_at
+    if stored_info and age < info_ttl:
+        print(f"  [Yahoo] [{i+1}/{n}] {ticker} info fresh ({age/3600:.1f}h old), skip.")
+        return
 
-            # Update anchor for next layer
-            current_first_date = pre[0][0]
-            current_first_price = pre[0][1] * scale
+    if stored_info and quote and now - stored_info.get("_fullInfoAt", 0) < FULL_INFO_TTL:
+        info = dict(stored_info)
+        for k in _QUOTE_FIELDS:
+            if k in quote:
+                info[k] = quote[k]
+                info.pop(_QUOTE_SHADOWED.get(k), None)
+        db_save_info(ticker, info)
+        print(f"  [Yahoo] [{i+1}/{n}] {ticker} info refreshed from quote.")
+        return
 
-        if total_spliced > 0:
-            print(f"  [Splice] {etf_ticker}: +{total_spliced} rows via {' → '.join(splice_desc_parts)}")
+    print(f"  [Yahoo] [{i+1}/{n}] Fetching {ticker} info...")
+    for attempt in range(3):
+        try:
+            t = yf.Ticker(ticker)
+            info = t.info or {}
+            if info and info.get("regularMarketPrice"):
+                info["_fullInfoAt"] = time.time()
+                db_save_info(ticker, info)
+                print(f"  [Yahoo] [{i+1}/{n}] {ticker} info saved.")
+                break
+        except Exception as e:
+            print(f"    {ticker}: attempt {attempt+1} failed: {e}")
+        if attempt < 2:
+            # Jittered, so workers rate-limited together don't retry in lockstep
+            time.sleep(8 * (attempt + 1) + random.uniform(0, 2))
 
 
 def fetch_yahoo_info():
     """Fetch ticker metadata from Yahoo. Only re-fetches if stored info > 3 days old.
-    Most metadata (market cap, price) changes daily, but expense ratio, name, etc. are stable."""
-    INFO_TTL = 259200  # 3 days in seconds
-    for i, ticker in enumerate(TICKERS):
-        stored_info, updated_at = db_load_info(ticker)
-        age = time.time() - updated_at
-        if stored_info and age < INFO_TTL:
-            print(f"  [Yahoo] [{i+1}/{len(TICKERS)}] {ticker} info fresh ({age/3600:.1f}h old), skip.")
-            continue
-
-        if i > 0:
-            time.sleep(6)
-
-        print(f"  [Yahoo] [{i+1}/{len(TICKERS)}] Fetching {ticker} info...")
-        for attempt in range(3):
+    Most metadata (market cap, price) changes daily, but expense ratio, name, etc. are stable:
+    stale tickers that already have info get the daily fields from one batched quote
+    request, and only the rest go through yfinance's per-ticker .info.
+    yfinance manages its own (curl_cffi) session, so only the fan-out is shared here."""
+    info_ttl = DATA_TTL["ticker_info"]
+    now = time.time()  # one reference for every ticker's TTL check
+    stale = [t for t in TICKERS if not _info_is_fresh(t, info_ttl, now)]
+    quotes = _yahoo_quote_batch(stale) if stale else {}
+    with ThreadPoolExecutor(max_workers=YAHOO_WORKERS) as pool:
+        futures = {pool.submit(_fetch_info, i, t, info_ttl, quotes.get(t), now): t
+                   for i, t in enumerate(TICKERS)}
+        for fut in as_completed(futures):
             try:
-                t = yf.Ticker(ticker)
-                info = t.info or {}
-                if info and info.get("regularMarketPrice"):
-                    db_save_info(ticker, info)
-                    print(f"  [Yahoo] [{i+1}/{len(TICKERS)}] {ticker} info saved.")
-                    break
+                fut.result()
             except Exception as e:
-                print(f"    Attempt {attempt+1} failed: {e}")
-            if attempt < 2:
-                time.sleep(8 * (attempt + 1))
+                print(f"  [Yahoo] {futures[fut]} info failed: {e}")
 
 
 # ══════════════════════════════════════════════════════════════════════
@@ -1437,12 +1746,12 @@ def fetch_alpha_vantage_prices(ticker):
         return False
     print(f"  [AlphaVantage] Fetching weekly prices for {ticker}...")
     try:
-        resp = http_requests.get("https://www.alphavantage.co/query", params={
+        resp = _HTTP.get("https://www.alphavantage.co/query", params={
             "function": "TIME_SERIES_WEEKLY_ADJUSTED",
             "symbol": ticker,
             "outputsize": "full",
             "apikey": ALPHA_VANTAGE_API_KEY,
-        }, timeout=30)
+        }, timeout=HTTP_TIMEOUT)
         data = resp.json()
 
         series = data.get("Weekly Adjusted Time Series")
@@ -1472,11 +1781,11 @@ def fetch_alpha_vantage_info(ticker):
         return False
     print(f"  [AlphaVantage] Fetching overview for {ticker}...")
     try:
-        resp = http_requests.get("https://www.alphavantage.co/query", params={
+        resp = _HTTP.get("https://www.alphavantage.co/query", params={
             "function": "OVERVIEW",
             "symbol": ticker,
             "apikey": ALPHA_VANTAGE_API_KEY,
-        }, timeout=30)
+        }, timeout=HTTP_TIMEOUT)
         data = resp.json()
 
         if not data or "Symbol" not in data:
@@ -1495,8 +1804,7 @@ def fetch_alpha_vantage_info(ticker):
             # Merge with any existing stored info
             existing, _ = db_load_info(ticker)
             if existing:
-                existing.update(info)
-                info = existing
+                info = {**existing, **info}
             db_save_info(ticker, info)
             print(f"  [AlphaVantage] Saved overview for {ticker}.")
             return True
@@ -1509,6 +1817,7 @@ def fetch_alpha_vantage_info(ticker):
 #  Data Fetchers — Statistics Denmark (Copenhagen housing)
 # ══════════════════════════════════════════════════════════════════════
 
+@lru_cache(maxsize=4096)
 def _parse_dst_quarter(time_str):
     """Convert DST quarter format ('2024Q1', '2024K1') to 'YYYY-MM-DD'."""
     try:
@@ -1528,14 +1837,89 @@ def _parse_dst_quarter(time_str):
         return None
 
 
+# Statistics Denmark tables to query, in order of preference.
+_DST_TABLES = (
+    {   # EJEN5: property sales price index by municipality
+        "table": "EJEN5",
+        "variables": [
+            {"code": "EJDTYPE", "values": ["6"]},
+            {"code": "OMRÅDE", "values": ["101"]},
+            {"code": "Tid", "values": ["*"]},
+        ],
+    },
+    {
+        "table": "EJENEU",
+        "variables": [
+            {"code": "BODO3", "values": ["TOT"]},
+            {"code": "BEBY", "values": ["1"]},
+            {"code": "Tid", "values": ["*"]},
+        ],
+    },
+)
+
+
+def _fetch_dst_table(attempt_cfg):
+    """POST one _DST_TABLES query. Returns its parsed (date_str, index) rows,
+    or [] if the table failed or had nothing usable."""
+    try:
+        payload = {
+            "table": attempt_cfg["table"],
+            "format": "JSON",
+            "variables": attempt_cfg["variables"],
+        }
+        print(f"  [DST] Trying table {attempt_cfg['table']}...")
+        resp = _HTTP.post(
+            "https://api.statbank.dk/v1/data",
+            json=payload, timeout=HTTP_TIMEOUT,
+        )
+
+        if resp.status_code != 200:
+            print(f"  [DST] {attempt_cfg['table']} returned HTTP {resp.status_code}")
+            return []
+
+        data = resp.json()
+        if not data:
+            return []
+
+        rows = []
+        for entry in data:
+            # DST JSON format: list of dicts with "key" and "values"
+            time_val = None
+            for k in entry.get("key", []):
+                code = (k.get("code") or "").upper()
+                if code == "TID" or code == "Tid":
+                    time_val = k.get("value", "")
+
+            idx_val = None
+            for v in entry.get("values", []):
+                try:
+                    idx_val = float(v)
+                    break
+                except (ValueError, TypeError):
+                    continue
+
+            if time_val and idx_val and idx_val > 0:
+                date_str = _parse_dst_quarter(time_val)
+                if date_str:
+                    rows.append((date_str, idx_val))
+
+        if not rows:
+            print(f"  [DST] No parseable rows from {attempt_cfg['table']}.")
+        return rows
+
+    except Exception as e:
+        print(f"  [DST] {attempt_cfg['table']} failed: {e}")
+        return []
+
+
 def fetch_dst_housing():
     """Fetch Copenhagen apartment price index from Statistics Denmark API."""
     # Skip if data is recent (quarterly updates)
     last_date = db_last_housing_date()
     if last_date:
         try:
-            last_dt = datetime.strptime(last_date, "%Y-%m-%d")
-            if (datetime.now() - last_dt).days < 80:
+            last_dt = _parse_iso(last_date)
+            if (datetime.now() - last_dt).days < DATA_TTL["cph_housing"] // 86400:
                 print(f"  [DST] Housing data recent ({last_date}), skipping.")
                 return True
         except Exception:
@@ -1543,78 +1927,19 @@ def fetch_dst_housing():
 
     print("  [DST] Fetching Copenhagen housing price index...")
 
-    # Try EJEN5 first (property sales price index by municipality)
-    tables_to_try = [
-        {
-            "table": "EJEN5",
-            "variables": [
-                {"code": "EJDTYPE", "values": ["6"]},
-                {"code": "OMRÅDE", "values": ["101"]},
-                {"code": "Tid", "values": ["*"]},
-            ],
-        },
-        {
-            "table": "EJENEU",
-            "variables": [
-                {"code": "BODO3", "values": ["TOT"]},
-                {"code": "BEBY", "values": ["1"]},
-                {"code": "Tid", "values": ["*"]},
-            ],
-        },
-    ]
-
-    for attempt_cfg in tables_to_try:
-        try:
-            payload = {
-                "table": attempt_cfg["table"],
-                "format": "JSON",
-                "variables": attempt_cfg["variables"],
-            }
-            print(f"  [DST] Trying table {attempt_cfg['table']}...")
-            resp = http_requests.post(
-                "https://api.statbank.dk/v1/data",
-                json=payload, timeout=30,
-            )
-
-            if resp.status_code != 200:
-                print(f"  [DST] {attempt_cfg['table']} returned HTTP {resp.status_code}")
-                continue
-
-            data = resp.json()
-            if not data:
-                continue
-
-            rows = []
-            for entry in data:
-                # DST JSON format: list of dicts with "key" and "values"
-                time_val = None
-                for k in entry.get("key", []):
-                    code = (k.get("code") or "").upper()
-                    if code == "TID" or code == "Tid":
-                        time_val = k.get("value", "")
-
-                idx_val = None
-                for v in entry.get("values", []):
-                    try:
-                        idx_val = float(v)
-                        break
-                    except (ValueError, TypeError):
-                        continue
-
-                if time_val and idx_val and idx_val > 0:
-                    date_str = _parse_dst_quarter(time_val)
-                    if date_str:
-                        rows.append((date_str, idx_val))
-
+    # Query every table at once, but take the first that yields rows in
+    # preference order — a failing EJEN5 no longer delays the EJENEU fallback.
+    pool = ThreadPoolExecutor(max_workers=len(_DST_TABLES), thread_name_prefix="dst-table")
+    try:
+        futures = [pool.submit(_fetch_dst_table, cfg) for cfg in _DST_TABLES]
+        for cfg, fut in zip(_DST_TABLES, futures):
+            rows = fut.result()
             if rows:
                 db_save_housing(rows)
-                print(f"  [DST] Saved {len(rows)} quarterly housing data points from {attempt_cfg['table']}.")
+                print(f"  [DST] Saved {len(rows)} quarterly housing data points from {cfg['table']}.")
                 return True
-            else:
-                print(f"  [DST] No parseable rows from {attempt_cfg['table']}.")
-
-        except Exception as e:
-            print(f"  [DST] {attempt_cfg['table']} failed: {e}")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
     print("  [DST] All table attempts failed — using fallback housing data.")
     return False
@@ -1626,9 +1951,16 @@ def fetch_dst_housing():
 
 def fetch_live_data():
     """Orchestrate all data fetching, save to SQLite, then recompute dashboard.
-    Incremental: only fetches data that is missing or stale."""
-    _cache["updating"] = True
+    Incremental: only fetches data that is missing or stale.
+    Returns False without doing anything if a refresh is already running."""
+    global _last_live_fetch
+    if not _refresh_lock.acquire(blocking=False):
+        return False
+    # Statistics Denmark is independent of the Yahoo / Alpha Vantage steps,
+    # so its request overlaps them on a side thread instead of running last.
+    side = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dst")
     try:
+        housing = side.submit(fetch_dst_housing)
         data_age = db_data_age_days()
         total = db_total_prices()
         print(f"\n  ═══ Starting live data fetch ═══")
@@ -1640,8 +1972,9 @@ def fetch_live_data():
         # Step 1b: If Yahoo failed, try Alpha Vantage for tickers with no/little data
         if not yahoo_ok and ALPHA_VANTAGE_API_KEY:
             print("  [Fallback] Yahoo history failed — trying Alpha Vantage...")
+            stats = db_price_stats()
             for ticker in TICKERS:
-                if db_price_count(ticker) < 10:
+                if stats.get(ticker, (0, None))[0] < 10:
                     fetch_alpha_vantage_prices(ticker)
                     time.sleep(1)
 
@@ -1655,8 +1988,8 @@ def fetch_live_data():
                     fetch_alpha_vantage_info(ticker)
                     time.sleep(1)
 
-        # Step 3: Copenhagen housing data from Statistics Denmark
-        fetch_dst_housing()
+        # Step 3: Copenhagen housing data from Statistics Denmark (started above)
+        housing.result()
 
         # Step 4: Recompute dashboard from DB
         results = compute_from_db()
@@ -1665,6 +1998,7 @@ def fetch_live_data():
         _cache["time"] = time.time()
         _cache["fetched_at"] = datetime.utcnow().isoformat() + "Z"
         _cache["source"] = "live"
+        _last_live_fetch = _cache["time"]
 
         save_disk_cache()
         total = db_total_prices()
@@ -1674,7 +2008,33 @@ def fetch_live_data():
         print(f"  ═══ Fetch failed: {e} ═══")
         traceback.print_exc()
     finally:
-        _cache["updating"] = False
+        side.shutdown(wait=True)
+        _refresh_lock.release()
+    return True
+
+
+def _refresh_loop():
+    """Background thread: every REFRESH_CHECK_INTERVAL, run an incremental
+    refresh if any dataset is past its DATA_TTL. Requests never wait on it."""
+    while True:
+        time.sleep(REFRESH_CHECK_INTERVAL)
+        try:
+            stale = stale_datasets()
+            if stale:
+                print(f"  [Refresh] Stale: {', '.join(stale)} — refreshing.")
+                fetch_live_data()
+        except Exception as e:
+            print(f"  [Refresh] Check failed: {e}")
+
+
+def _background_refresh(delay=0):
+    """Thread body for a one-off refresh (startup, /api/refresh). The thread
+    ends with it, so its connection is closed here rather than left to GC."""
+    time.sleep(delay)
+    try:
+        fetch_live_data()
+    finally:
+        _close_db()
 
 
 # ══════════════════════════════════════════════════════════════════════
@@ -1713,8 +2073,7 @@ def load_disk_cache():
     """Load JSON cache from disk (any age — always prefer over fallback)."""
     if CACHE_FILE.exists():
         try:
-            with open(CACHE_FILE) as f:
-                disk = json.load(f)
+            disk = _json_loads(CACHE_FILE.read_bytes())
             age = time.time() - disk.get("time", 0)
             if disk.get("data"):
                 _enrich_stddev_sharpe(disk["data"])
@@ -1738,14 +2097,16 @@ def load_disk_cache():
 
 
 def save_disk_cache():
-    """Persist in-memory cache to JSON disk file."""
+    """Persist in-memory cache to JSON disk file. Written to a temp file and
+    swapped in, so a crash mid-write never leaves a truncated cache behind."""
+    tmp = CACHE_FILE.with_suffix(".tmp")
     try:
-        with open(CACHE_FILE, "w") as f:
-            json.dump({
-                "data": _cache["data"],
-                "time": _cache["time"],
-                "fetched_at": _cache["fetched_at"],
-            }, f)
+        tmp.write_text(_json_dumps({
+            "data": _cache["data"],
+            "time": _cache["time"],
+            "fetched_at": _cache["fetched_at"],
+        }))
+        os.replace(tmp, CACHE_FILE)
     except Exception as e:
         print(f"  Could not write JSON cache: {e}")
 
@@ -1761,15 +2122,21 @@ def api_etfs():
         "cached": _cache["source"] != "live",
         "source": _cache["source"],
         "fetchedAt": _cache.get("fetched_at") or datetime.utcnow().isoformat() + "Z",
-        "updating": _cache["updating"],
+        "updating": _refresh_lock.locked(),
     })
 
 
 @app.route("/api/refresh", methods=["POST"])
 def api_refresh():
-    if _cache["updating"]:
+    # Stale-while-revalidate: the current data keeps being served by
+    # /api/etfs while the refresh runs in the background.
+    if _refresh_lock.locked():
         return jsonify({"status": "already_updating"})
-    thread = threading.Thread(target=fetch_live_data, daemon=True)
+    # Only skip when a live fetch just finished and nothing it covers is stale
+    # (e.g. a step that failed); a restart always allows the first refresh.
+    if time.time() - _last_live_fetch < REFRESH_MIN_AGE and not stale_datasets():
+        return jsonify({"status": "fresh"})
+    thread = threading.Thread(target=_background_refresh, daemon=True)
     thread.start()
     return jsonify({"status": "refresh_started"})
 
@@ -1797,62 +2164,62 @@ def api_growth():
             break
 
     now = datetime.now()
-    cutoff = (now - timedelta(days=years * 365.25)).strftime("%Y-%m-%d")
+    cutoff = np.datetime64((now - timedelta(days=years * 365.25)).date(), "D")
 
     # ── Step 1: Collect raw price series for each ticker ──────────────
-    raw_series = {}  # ticker -> list of (date, price)
+    raw_series = {}  # ticker -> PriceSeries (closes not yet normalized)
 
     for ticker in tickers_req:
         if ticker.startswith("PORT-"):
             # For portfolio, build from constituents
             constituent_series = {}
             for ct in port_constituents:
-                rows = _get_raw_prices(ct, cutoff)
-                if rows:
-                    constituent_series[ct] = rows
+                series = _get_raw_prices(ct, cutoff)
+                if series:
+                    constituent_series[ct] = series
             if constituent_series:
                 # Find the common start date for all constituents
-                const_start = max(rows[0][0] for rows in constituent_series.values())
-                # Build equal-weight portfolio series
-                all_by_date = {}
-                for ct, rows in constituent_series.items():
-                    # Filter to common start and normalize
-                    filtered = [(d, p) for d, p in rows if d >= const_start]
-                    if not filtered:
-                        continue
-                    base_p = filtered[0][1]
-                    if base_p <= 0:
+                const_start = max(s.dates[0] for s in constituent_series.values())
+                # Equal-weight portfolio: each constituent normalized to 1.0 at
+                # the common start, as one column of a T×N matrix over the
+                # union of their dates (NaN where it has no price that date)
+                cols = []
+                for ct, series in constituent_series.items():
+                    i = series.dates.searchsorted(const_start)
+                    if i == len(series.dates):
                         continue
-                    for d, p in filtered:
-                        all_by_date.setdefault(d, []).append(p / base_p)
-                n_const = len(constituent_series)
-                port_raw = []
-                for d in sorted(all_by_date.keys()):
-                    ratios = all_by_date[d]
-                    avg_ratio = sum(ratios) / n_const
-                    port_raw.append((d, avg_ratio))
-                if port_raw:
-                    raw_series[ticker] = port_raw
+                    cols.append((series.dates[i:], series.closes[i:] / series.closes[i]))
+                if cols:
+                    dates = np.unique(np.concatenate([d for d, _ in cols]))
+                    ratios = np.full((len(dates), len(cols)), np.nan)
+                    for j, (d, r) in enumerate(cols):
+                        ratios[dates.searchsorted(d), j] = r
+                    # Carry each constituent's last price across dates it has
+                    # no quote for (CPH-RE is quarterly, the ETFs weekly), then
+                    # average over the constituents priced by that date
+                    rows = np.where(np.isnan(ratios), 0, np.arange(len(dates))[:, None])
+                    ratios = ratios[np.maximum.accumulate(rows, axis=0), np.arange(len(cols))]
+                    raw_series[ticker] = PriceSeries(dates, np.nanmean(ratios, axis=1))
             else:
                 # Synthetic fallback
                 synth = _synthetic_growth(ticker, years, base)
                 if synth:
-                    raw_series[ticker] = [(p[0], p[1] / base) for p in synth]
+                    raw_series[ticker] = synth
         else:
-            rows = _get_raw_prices(ticker, cutoff)
-            if rows:
-                # Store as (date, price) — we'll normalize after alignment
-                raw_series[ticker] = rows
+            series = _get_raw_prices(ticker, cutoff)
+            if series:
+                # Normalized after alignment
+                raw_series[ticker] = series
             else:
                 synth = _synthetic_growth(ticker, years, base)
                 if synth:
-                    raw_series[ticker] = [(p[0], p[1] / base) for p in synth]
+                    raw_series[ticker] = synth
 
     if not raw_series:
         return jsonify({})
 
     # ── Step 2: Find common start date (latest earliest date) ─────────
-    common_start = max(series[0][0] for series in raw_series.values())
+    common_start = max(s.dates[0] for s in raw_series.values())
 
     # ── Step 3: Trim, normalize to $10K from common start, and build output
     result = {}
@@ -1861,16 +2228,14 @@ def api_growth():
         if not series:
             result[ticker] = []
             continue
-        # Filter to common start
-        filtered = [(d, p) for d, p in series if d >= common_start]
-        if len(filtered) < 2:
-            result[ticker] = []
-            continue
-        base_val = filtered[0][1]
-        if base_val <= 0:
+        # Trim to common start
+        i = series.dates.searchsorted(common_start)
+        dates, prices = series.dates[i:], series.closes[i:]
+        if len(prices) < 2 or prices[0] <= 0:
             result[ticker] = []
             continue
-        result[ticker] = [[d, round(base * p / base_val, 2)] for d, p in filtered]
+        values = base * prices / prices[0]
+        result[ticker] = [[d, round(v, 2)] for d, v in zip(dates.astype(str).tolist(), values.tolist())]
 
     # Add metadata about the common period
     if result:
@@ -1886,43 +2251,51 @@ def api_growth():
 
 
 def _get_raw_prices(ticker, cutoff):
-    """Load raw (date, price) pairs for a ticker, filtered to >= cutoff.  Returns list or None."""
-    if ticker == "CPH-RE":
-        rows = db_load_housing()
-    else:
-        rows = db_load_prices(ticker)
-    if len(rows) < 4:
+    """Load a ticker's PriceSeries, filtered to dates >= cutoff (datetime64[D])
+    and positive closes.  Returns the series or None."""
+    series = db_load_housing_series() if ticker == "CPH-RE" else db_load_series(ticker)
+    if len(series.dates) < 4:
         return None
-    filtered = [(d, p) for d, p in rows if d >= cutoff and p > 0]
-    if len(filtered) < 2:
+    i = series.dates.searchsorted(cutoff)
+    dates, closes = series.dates[i:], series.closes[i:]
+    keep = closes > 0
+    if keep.sum() < 2:
         return None
-    return filtered
+    return PriceSeries(dates[keep], closes[keep])
 
 
 def _synthetic_growth(ticker, years, base):
-    """Generate a synthetic monthly growth curve from cached annualized return data."""
+    """Generate a synthetic monthly growth curve from cached annualized return data,
+    as a PriceSeries of (value rounded to the cent) / base.  Returns None if the
+    ticker has no usable return."""
     entry = None
     for e in _cache.get("data", []):
         if e.get("ticker") == ticker:
             entry = e
             break
     if not entry:
-        return []
+        return None
 
     # Pick the best available annualized return
     ann = best_annualized_return(entry)
     if ann is None:
-        return []
+        return None
 
-    monthly_rate = math.pow(1 + ann / 100, 1 / 12)
-    now = datetime.now()
-    total_months = years * 12
-    points = []
-    for m in range(total_months + 1):
-        d = (now - timedelta(days=(total_months - m) * 30.44)).strftime("%Y-%m-%d")
-        val = round(base * math.pow(monthly_rate, m), 2)
-        points.append([d, val])
-    return points
+    monthly_rate = (1 + ann / 100) ** (1 / 12)
+    dates = _synthetic_dates(years * 12, datetime.now().date())
+    values = np.array([round(base * monthly_rate ** m, 2) for m in range(len(dates))])
+    return PriceSeries(dates, values / base)
+
+
+@lru_cache(maxsize=8)
+def _synthetic_dates(total_months, today):
+    """Month-spaced (30.44-day) datetime64[D] dates ending on *today*, oldest
+    first. Shared (read-only) by every synthetic curve of the same length on
+    the same day."""
+    offsets = np.rint((total_months - np.arange(total_months + 1)) * 30.44).astype("timedelta64[D]")
+    dates = np.datetime64(today, "D") - offsets
+    dates.flags.writeable = False
+    return dates
 
 
 @app.route("/")
@@ -1957,18 +2330,10 @@ if __name__ == "__main__":
         if not load_disk_cache():
             print("  No stored data — using hardcoded fallback.")
             # Apply diversification sort to fallback data
-            fb = diversification_sort(list(FALLBACK_DATA), FALLBACK_CORR_MAP, top_n=4)
-            for i, etf in enumerate(fb):
-                etf["rank"] = i + 1
-                if i < 4:
-                    etf["rankReason"] = "Top 10Y return"
-                else:
-                    ct = etf["ticker"]
-                    corrs = [FALLBACK_CORR_MAP.get(ct, {}).get(prev["ticker"], 0.5) for prev in fb[:i]]
-                    avg_c = sum(corrs) / len(corrs) if corrs else 0
-                    etf["rankReason"] = f"Diversifier (avg corr {avg_c:+.2f})"
+            fb = diversification_sort(list(FALLBACK_DATA), FALLBACK_CORR_MAT, top_n=4)
+            assign_ranks(fb, FALLBACK_CORR_MAT, top_n=4)
             # Build equal-weight portfolio of top 7 and insert as first entry
-            portfolio = build_portfolio_entry(fb, n=7, corr_map=FALLBACK_CORR_MAP)
+            portfolio = build_portfolio_entry(fb, n=7, corr_mat=FALLBACK_CORR_MAT)
             fb.insert(0, portfolio)
             _cache["data"] = fb
             _cache["time"] = time.time()
@@ -1986,25 +2351,25 @@ if __name__ == "__main__":
         print("  Alpha Vantage fallback: disabled (set ALPHA_VANTAGE_API_KEY to enable)")
     print(f"\n  → http://localhost:3000\n")
 
-    # 3. Background fetch if DB is empty or data is stale
-    #    Uses SQLite data freshness (not JSON cache age) as the primary check.
-    #    Data older than 3 days triggers an incremental update.
+    # 3. Background fetch if DB is empty or any dataset is past its DATA_TTL
+    #    Uses SQLite data freshness (not JSON cache age) as the primary check;
+    #    each fetch step then skips whatever is still within its own TTL.
     need_fetch = False
+    stale = stale_datasets()
     if total == 0:
         print(f"  DB is empty — will fetch prices in background.\n")
         need_fetch = True
-    elif data_age is not None and data_age > 3:
-        print(f"  Data is {data_age:.0f} day(s) old — will fetch incremental update in background.\n")
+    elif stale:
+        print(f"  Stale: {', '.join(stale)} — will fetch incremental update in background.\n")
         need_fetch = True
     else:
         print(f"  Data is current ({data_age:.0f} day(s) old) — no fetch needed.\n")
 
     if need_fetch:
         print("  Background data fetch starting in 3s...\n")
-        def delayed_fetch():
-            time.sleep(3)
-            fetch_live_data()
-        bg = threading.Thread(target=delayed_fetch, daemon=True)
+        bg = threading.Thread(target=_background_refresh, args=(3,), daemon=True)
         bg.start()
 
+    threading.Thread(target=_refresh_loop, daemon=True).start()
+
     app.run(host="0.0.0.0", port=3000, debug=False)